@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark the table parser backends on synthetic crawler pages
+
+Usage: python parser_benchmark.py [--sizes 10 100 1000 10000 100000] [--repeat 3]
+"""
+import argparse
+import random
+import time
+
+from server import (
+    TABLE_PARSER_BACKENDS,
+    available_table_parsers,
+    extract_table_rows,
+    map_table_rows,
+)
+
+TYPES = ["鬼砍", "剑客", "杀手"]
+GUILDS = ["青帮", "无门派", "九雷剑", "五毒"]
+STATUSES = ["在线", "离线", "忙碌", "人脸提示", "没钱了"]
+
+def build_page(row_count: int, seed: int = 42) -> str:
+    """Build a login-result page whose first table has row_count data rows"""
+    rng = random.Random(seed)
+    header = "".join(f"<th>{title}</th>" for title in [
+        "序号", "IP", "类型", "命名", "等级", "门派", "绝技", "次数", "总时间", "状态", "运行时间"
+    ])
+    rows = []
+    for i in range(1, row_count + 1):
+        cells = [
+            i,
+            f"222.210.{rng.randint(0, 255)}.{rng.randint(0, 255)}",
+            rng.choice(TYPES),
+            f"角色{i}",
+            rng.randint(80, 120),
+            rng.choice(GUILDS),
+            rng.randint(0, 3),
+            f"{rng.randint(0, 50)}/{rng.randint(100, 200)}",
+            f"{rng.randint(1, 12)}/{rng.randint(100, 200)}",
+            rng.choice(STATUSES),
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+        ]
+        rows.append("<tr>" + "".join(f"<td> {cell} </td>" for cell in cells) + "</tr>")
+
+    return (
+        "<!DOCTYPE html><html><head><title>x8</title>"
+        "<style>td { padding: 2px; }</style><script>var refresh = 45;</script></head><body>"
+        "<div class='nav'><a href='/'>首页</a> <a href='/logout'>退出</a></div>"
+        f"<table class='data'><thead><tr>{header}</tr></thead><tbody>{''.join(rows)}</tbody></table>"
+        "<table class='footer'><tr><td>footer</td></tr></table>"
+        "<div class='footer'>" + "<p>padding</p>" * 200 + "</div></body></html>"
+    )
+
+def comparable(data_list):
+    return [item.dict(exclude={"id", "crawl_timestamp"}) for item in data_list]
+
+def best_time(func, repeat: int) -> float:
+    """Best wall time in seconds over repeat runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = available_table_parsers()
+    missing = [name for name in TABLE_PARSER_BACKENDS if name not in backends]
+    if missing:
+        print(f"Skipping unavailable backends: {', '.join(missing)}")
+
+    # Backend columns time extraction only, the map column is the shared CrawlerData mapping
+    print(f"{'rows':>8} {'page KB':>9} " + " ".join(f"{name:>12}" for name in backends + ["map"]))
+    for size in args.sizes:
+        html = build_page(size)
+        reference = comparable(map_table_rows(extract_table_rows(html, "bs4"), "bench"))
+        for backend in backends:
+            result = comparable(map_table_rows(extract_table_rows(html, backend), "bench"))
+            if result != reference:
+                raise SystemExit(f"Backend {backend} output differs from bs4 at {size} rows")
+
+        # Large tables are slow on bs4, fewer repeats keep the run short
+        repeat = args.repeat if size <= 10000 else 1
+        timings = [best_time(lambda: extract_table_rows(html, backend), repeat) for backend in backends]
+        rows = extract_table_rows(html, "stream")
+        timings.append(best_time(lambda: map_table_rows(rows, "bench"), repeat))
+        print(f"{size:>8} {len(html) / 1024:>9.1f} " + " ".join(f"{seconds * 1000:>10.1f}ms" for seconds in timings))
+
+if __name__ == "__main__":
+    main()
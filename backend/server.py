@@ -1,24 +1,29 @@
 from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, ConnectionFailure, CollectionInvalid
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Iterator, AsyncIterator, Callable
 import uuid
+import random
 from datetime import datetime, timedelta
 import asyncio
 import json
+import hashlib
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.webdriver.remote.command import Command
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException, StaleElementReferenceException
 from webdriver_manager.chrome import ChromeDriverManager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -26,9 +31,43 @@ import pandas as pd
 import io
 import re
 from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 import time
+from urllib.parse import urljoin
+import httpx
 from concurrent.futures import ThreadPoolExecutor
+import functools
+import itertools
+import fnmatch
 import threading
+import queue
+from collections import deque, OrderedDict
+import base64
+import shutil
+import tempfile
+
+# Optional fast HTML parser backends for table parsing
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+# Optional process inspection for the browser memory governor
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Optional WebSocket client for the CDP browser backend
+try:
+    import websockets
+except ImportError:
+    websockets = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -45,17 +84,27 @@ app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
 # Global variables for crawler management
-active_crawlers = {}
 crawler_data = {}
 scheduler = AsyncIOScheduler()
 websocket_connections = set()
 
+# Per-account crawl tasks that are still running, guards against overlapping crawls
+crawls_in_flight: Dict[str, asyncio.Task] = {}
+CRAWL_JOB_PREFIX = "crawl_account_"
+
+# Worker pool for blocking Selenium calls, sized by CrawlerConfig.max_concurrent
+browser_pool: Optional[ThreadPoolExecutor] = None
+browser_pool_size = 0
+browser_pool_lock = threading.Lock()
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+# httpx logs every request of the HTTP fast path at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # Define Models
 class StatusCheck(BaseModel):
@@ -111,6 +160,37 @@ class CrawlerConfig(BaseModel):
     headless: bool = True
     timeout: int = 30
     retry_count: int = 3
+    login_timeout: int = 30  # seconds budget for one complete login
+    table_extraction: str = "script"  # script (cell texts serialized in the browser) or html (page_source parse)
+    html_parser: str = "auto"  # HTML table parser backend: auto (fastest installed), selectolax, lxml, stream or bs4
+    crawl_mode: str = "auto"  # auto (HTTP fast path, browser fallback), http, browser
+    http_login_fields: Dict[str, str] = Field(default_factory=dict)  # Extra form fields for the 师门 login
+    http_retry_interval: int = 600  # seconds to skip the fast path after it failed in auto mode
+    session_ttl: int = 1800  # seconds a saved login session is trusted when cookies carry no expiry
+    crawl_jitter: int = 5  # seconds of random jitter added to each account's schedule
+    crawl_deadline: Optional[int] = None  # seconds an account crawl may take per tick, defaults to crawl_interval
+    adaptive_interval: bool = True  # back off stable accounts, tighten on changing ones
+    min_crawl_interval: int = 15  # seconds
+    max_crawl_interval: int = 600  # seconds
+    interval_backoff: float = 1.5  # factor applied per unchanged / changed crawl
+    write_batch_size: int = 500  # rows per bulk write and websocket broadcast of a crawl
+    screenshot_policy: str = "failure"  # login debug screenshots: off, failure, sample or always
+    screenshot_sample_rate: int = 20  # with the sample policy, capture every step of one login in N
+    screenshot_dir: str = "/app/debug_screenshots"
+    screenshot_max_bytes: int = 50 * 1024 * 1024  # oldest screenshots are deleted beyond this size
+    # stylesheet is opt-in: login element visibility and clickability depend on CSS layout
+    block_resources: List[str] = Field(default_factory=lambda: ["image", "font", "media", "analytics"])
+    resource_allowlist: List[str] = Field(default_factory=list)  # resource types or URL patterns (* wildcards) always loaded
+    browser_max_age: int = 3600  # seconds before a browser is recycled, 0 disables
+    browser_max_pages: int = 500  # page loads before a browser is recycled, 0 disables
+    browser_max_rss_mb: int = 800  # process tree memory before a browser is recycled, 0 disables
+    warm_pool_size: int = 2  # idle pre-launched browsers ready for new sessions, validation and tests
+    browser_contexts: bool = False  # host many accounts per Chromium, each in an isolated browser context
+    accounts_per_browser: int = 20  # browser contexts per Chromium process in browser_contexts mode and the cdp backend
+    shared_browser_max_rss_mb: int = 2048  # process tree memory before a shared browser is retired, 0 disables
+    browser_backend: str = "selenium"  # selenium (chromedriver in worker threads) or cdp (async DevTools protocol)
+    network_capture: bool = False  # read the table from the page's JSON XHR response when one is found
+    history_enabled: bool = True  # append saved rows to crawler_history and its 1m/1h/1d rollups
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class CrawlerStats(BaseModel):
@@ -120,6 +200,2693 @@ class CrawlerStats(BaseModel):
     last_update: Optional[datetime] = None
     crawl_status: str
 
+# Browser Worker Pool
+def get_browser_pool(size: int) -> ThreadPoolExecutor:
+    """Get the browser worker pool, recreating it when max_concurrent changes"""
+    global browser_pool, browser_pool_size
+    size = max(1, size)
+    with browser_pool_lock:
+        if browser_pool is None or browser_pool_size != size:
+            old_pool = browser_pool
+            browser_pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="browser-worker")
+            browser_pool_size = size
+            if old_pool:
+                # Let in-flight browser work finish on the old pool
+                old_pool.shutdown(wait=False)
+            logger.info(f"Browser worker pool ready with {size} workers")
+        return browser_pool
+
+async def run_in_browser_pool(size: int, func, *args, **kwargs):
+    """Run a blocking browser call on the worker pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_browser_pool(size), functools.partial(func, *args, **kwargs))
+
+def shutdown_browser_pool():
+    """Shut down the browser worker pool"""
+    global browser_pool, browser_pool_size
+    with browser_pool_lock:
+        if browser_pool:
+            browser_pool.shutdown(wait=False)
+            browser_pool = None
+            browser_pool_size = 0
+
+# Table Parsing
+# Serializes the first table's cell texts in the browser, matching BeautifulSoup's get_text(strip=True)
+TABLE_EXTRACT_SCRIPT = """
+var table = document.getElementsByTagName('table')[0];
+if (!table) {
+    return null;
+}
+function cellText(cell) {
+    var walker = document.createTreeWalker(cell, NodeFilter.SHOW_TEXT, null, false);
+    var parts = [];
+    while (walker.nextNode()) {
+        var parent = walker.currentNode.parentNode.nodeName;
+        if (parent === 'SCRIPT' || parent === 'STYLE') {
+            continue;
+        }
+        var part = walker.currentNode.nodeValue.trim();
+        if (part) {
+            parts.push(part);
+        }
+    }
+    return parts.join('');
+}
+var rows = [];
+var trs = table.getElementsByTagName('tr');
+for (var i = 0; i < trs.length; i++) {
+    var cells = trs[i].querySelectorAll('td, th');
+    var row = [];
+    for (var j = 0; j < cells.length; j++) {
+        row.push(cellText(cells[j]));
+    }
+    rows.push(row);
+}
+return rows;
+"""
+
+def iter_crawler_rows(rows: Iterable[List[str]], account_username: str) -> Iterator[CrawlerData]:
+    """Map the cell texts of the data table (header row first) into CrawlerData rows, lazily"""
+    for i, cols in enumerate(itertools.islice(rows, 1, None), 1):  # Skip header row
+        if len(cols) >= 10:  # Ensure we have enough columns
+            try:
+                # Parse count/total from format like "20/199"
+                count_match = re.match(r'(\d+)/(\d+)', cols[7])
+                count_current = int(count_match.group(1)) if count_match else 0
+                count_total = int(count_match.group(2)) if count_match else 0
+                
+                data_item = CrawlerData(
+                    account_username=account_username,
+                    sequence_number=int(cols[0]),
+                    ip=cols[1],
+                    type=cols[2],
+                    name=cols[3],
+                    level=int(cols[4]) if cols[4].isdigit() else 0,
+                    guild=cols[5],
+                    skill=cols[6],
+                    count_current=count_current,
+                    count_total=count_total,
+                    accumulated_count=0,  # Will be set in accumulate_data
+                    total_time=cols[8],
+                    status=cols[9],
+                    runtime=cols[10] if len(cols) > 10 else "",
+                    keywords_detected={}  # Will be set in accumulate_data
+                )
+                yield data_item
+            except (ValueError, AttributeError) as e:
+                logger.warning(f"Error parsing row {i}: {str(e)}")
+                continue
+
+def map_table_rows(rows: List[List[str]], account_username: str) -> List[CrawlerData]:
+    """Map the cell texts of the data table (header row first) into CrawlerData rows"""
+    return list(iter_crawler_rows(rows, account_username))
+
+def extract_table_rows_bs4(html: str) -> Optional[List[List[str]]]:
+    """Extract the first table's cell texts with BeautifulSoup and html.parser"""
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Find the data table
+    tables = soup.find_all('table')
+    if not tables:
+        return None
+    
+    # Use the first table (assuming it's the data table)
+    table = tables[0]
+    return [
+        [col.get_text(strip=True) for col in row.find_all(['td', 'th'])]
+        for row in table.find_all('tr')
+    ]
+
+def has_unclosed_table_tags(html: str) -> bool:
+    """Whether table, row or cell tags are left unclosed (or closed twice) anywhere in the page
+
+    lxml and selectolax recover those like a browser, as sibling cells and rows, while
+    BeautifulSoup's html.parser nests them. Such pages go to the stream parser instead.
+    """
+    # Plain substring counts, a regex scan costs more than the fast parsers themselves
+    page = html.lower() if "<T" in html or "</T" in html else html
+    opened = {
+        "table": page.count("<table"),
+        "tr": page.count("<tr") - page.count("<track"),
+        "td": page.count("<td"),
+        "th": page.count("<th") - page.count("<thead"),
+    }
+    closed = {
+        "table": page.count("</table"),
+        "tr": page.count("</tr"),
+        "td": page.count("</td"),
+        "th": page.count("</th") - page.count("</thead"),
+    }
+    return opened != closed
+
+def _lxml_text_parts(element, parts: List[str]):
+    """Collect text nodes below an lxml element like get_text does, skipping comments and scripts"""
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in ('script', 'style'):
+            if child.text:
+                parts.append(child.text)
+            _lxml_text_parts(child, parts)
+        if child.tail:
+            parts.append(child.tail)
+
+def _lxml_cell_text(cell) -> str:
+    parts = [cell.text] if cell.text else []
+    _lxml_text_parts(cell, parts)
+    return "".join(part.strip() for part in parts)
+
+def extract_table_rows_lxml(html: str) -> Optional[List[List[str]]]:
+    """Extract the first table's cell texts with lxml"""
+    if not html.strip():
+        return None
+    if has_unclosed_table_tags(html):
+        return extract_table_rows_stream(html)
+    table = next(lxml.html.fromstring(html).iter('table'), None)
+    if table is None:
+        return None
+    return [
+        [_lxml_cell_text(cell) for cell in row.iterdescendants('td', 'th')]
+        for row in table.iter('tr')
+    ]
+
+def extract_table_rows_selectolax(html: str) -> Optional[List[List[str]]]:
+    """Extract the first table's cell texts with selectolax"""
+    if has_unclosed_table_tags(html):
+        return extract_table_rows_stream(html)
+    tree = SelectolaxParser(html)
+    # get_text skips script and style contents
+    tree.strip_tags(['script', 'style'])
+    table = tree.css_first('table')
+    if table is None:
+        return None
+    return [
+        [
+            cell.text(deep=True, separator='', strip=True)
+            for cell in row.traverse(include_text=False)
+            if cell.tag in ('td', 'th')
+        ]
+        for row in table.traverse(include_text=False)
+        if row.tag == 'tr'
+    ]
+
+class FirstTableParser(HTMLParser):
+    """Streaming tokenizer that collects the first table's cell texts and stops after its closing tag
+
+    Mirrors BeautifulSoup's html.parser tree: unclosed cells and rows nest, an end tag
+    closes everything up to the matching open tag, and a cell's text includes nested cells.
+    """
+    
+    TRACKED_TAGS = ('table', 'tr', 'td', 'th', 'script', 'style')
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: Optional[List[List[List[str]]]] = None
+        self.done = False
+        self.stack: List[tuple] = []  # (tag, row or cell) of open tags inside the table
+        self.pending_text: List[str] = []
+    
+    def flush_text(self):
+        if not self.pending_text:
+            return
+        text = "".join(self.pending_text).strip()
+        self.pending_text = []
+        if not text or any(tag in ('script', 'style') for tag, _ in self.stack):
+            return
+        for tag, cell in self.stack:
+            if tag in ('td', 'th'):
+                cell.append(text)
+    
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        # Every tag boundary ends a text node
+        self.flush_text()
+        if tag not in self.TRACKED_TAGS:
+            return
+        if self.rows is None:
+            if tag != 'table':
+                return
+            self.rows = []
+        if tag == 'tr':
+            row = []
+            self.rows.append(row)
+            self.stack.append((tag, row))
+        elif tag in ('td', 'th'):
+            cell = []
+            for open_tag, row in self.stack:
+                if open_tag == 'tr':
+                    row.append(cell)
+            self.stack.append((tag, cell))
+        else:
+            self.stack.append((tag, None))
+    
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags never contain text, but still end a text node
+        self.flush_text()
+    
+    def handle_endtag(self, tag):
+        if self.done or self.rows is None:
+            return
+        self.flush_text()
+        if tag not in self.TRACKED_TAGS or not any(open_tag == tag for open_tag, _ in self.stack):
+            return
+        while self.stack:
+            open_tag, _ = self.stack.pop()
+            if open_tag == tag:
+                break
+        if not self.stack:
+            self.done = True
+    
+    def handle_data(self, data):
+        if self.rows is not None and not self.done:
+            self.pending_text.append(data)
+    
+    def handle_comment(self, data):
+        self.flush_text()
+    
+    def pop_completed_rows(self, final: bool = False) -> List[List[str]]:
+        """Remove and return the rows no open tag can still add text to"""
+        if not self.rows:
+            return []
+        completed = len(self.rows)
+        if not final:
+            # An open row, and every row after it, may still receive text from nested cells
+            open_rows = {id(row) for tag, row in self.stack if tag == 'tr'}
+            completed = next((i for i, row in enumerate(self.rows) if id(row) in open_rows), completed)
+        rows = self.rows[:completed]
+        del self.rows[:completed]
+        return [["".join(cell) for cell in row] for row in rows]
+    
+    def iter_rows(self, html: str, chunk_size: int = 65536) -> Iterator[List[str]]:
+        """Feed a page in chunks, yielding each row of the first table as soon as it is complete"""
+        for start in range(0, len(html), chunk_size):
+            self.feed(html[start:start + chunk_size])
+            yield from self.pop_completed_rows()
+            if self.done:
+                break
+        if not self.done:
+            self.close()
+            self.flush_text()
+        yield from self.pop_completed_rows(final=True)
+
+def extract_table_rows_stream(html: str, chunk_size: int = 65536) -> Optional[List[List[str]]]:
+    """Extract the first table's cell texts, tokenizing only up to the table's closing tag"""
+    parser = FirstTableParser()
+    rows = list(parser.iter_rows(html, chunk_size))
+    if parser.rows is None:
+        return None
+    return rows
+
+TABLE_PARSER_BACKENDS = {
+    "bs4": extract_table_rows_bs4,
+    "lxml": extract_table_rows_lxml,
+    "selectolax": extract_table_rows_selectolax,
+    "stream": extract_table_rows_stream,
+}
+
+# Fastest first, the "auto" backend picks the first one installed
+TABLE_PARSER_PREFERENCE = ["selectolax", "lxml", "stream"]
+
+unavailable_parsers_warned = set()
+
+def available_table_parsers() -> List[str]:
+    """Table parser backends whose libraries are installed"""
+    return [
+        name for name in TABLE_PARSER_BACKENDS
+        if (name != "lxml" or lxml is not None) and (name != "selectolax" or SelectolaxParser is not None)
+    ]
+
+def resolve_table_parser(backend: str) -> str:
+    """The configured parser backend, or the stream parser when its library is missing"""
+    if backend == "auto":
+        return next(name for name in TABLE_PARSER_PREFERENCE if name in available_table_parsers())
+    if backend not in available_table_parsers():
+        if backend not in unavailable_parsers_warned:
+            unavailable_parsers_warned.add(backend)
+            logger.warning(f"Table parser backend '{backend}' is not available, using stream parser")
+        return "stream"
+    return backend
+
+def extract_table_rows(html: str, backend: str = "bs4") -> Optional[List[List[str]]]:
+    """Extract the cell texts of the first table in a page, None when there is no table"""
+    return TABLE_PARSER_BACKENDS[resolve_table_parser(backend)](html)
+
+def iter_table_rows(html: str, backend: str = "bs4") -> Iterator[List[str]]:
+    """Yield the first table's cell texts row by row, incrementally with the stream parser"""
+    backend = resolve_table_parser(backend)
+    if backend == "stream":
+        parser = FirstTableParser()
+        yield from parser.iter_rows(html)
+        if parser.rows is None:
+            logger.warning("No table found on the page")
+        return
+    
+    rows = extract_table_rows(html, backend)
+    if rows is None:
+        logger.warning("No table found on the page")
+        return
+    yield from rows
+
+# Crawl Pipeline
+KEYWORDS_TO_TRACK = ["人脸提示", "没钱了", "网络异常", "系统维护", "账号异常", "登录失败"]
+
+def take_batch(iterator: Iterator, size: int) -> List:
+    """Advance an iterator by up to size items"""
+    return list(itertools.islice(iterator, size))
+
+async def iter_batches(items: Iterable, size: int) -> AsyncIterator[List]:
+    """Yield a lazy row pipeline in fixed-size batches, advancing it in the default executor"""
+    iterator = iter(items)
+    loop = asyncio.get_running_loop()
+    while True:
+        # Parsing and mapping are CPU bound, keep them off the event loop
+        batch = await loop.run_in_executor(None, take_batch, iterator, max(1, size))
+        if not batch:
+            return
+        yield batch
+
+def count_keywords(keyword_stats: Dict[str, Dict[str, Any]], data_list: List[CrawlerData]):
+    """Add the keywords detected in a batch of rows to running keyword statistics"""
+    for data_item in data_list:
+        for keyword, count in data_item.keywords_detected.items():
+            stats = keyword_stats.setdefault(keyword, {
+                "keyword": keyword,
+                "total_count": 0,
+                "accounts_affected": set(),
+                "last_seen": datetime.utcnow()
+            })
+            stats["total_count"] += count
+            stats["accounts_affected"].add(data_item.account_username)
+            stats["last_seen"] = datetime.utcnow()
+
+# Crawler Data Writes
+# A crawled row is identified by its account, sequence number and IP, unique in crawler_data
+CRAWLER_DATA_KEY = [("account_username", 1), ("sequence_number", 1), ("ip", 1)]
+CRAWLER_DATA_KEY_INDEX = "account_sequence_ip_unique"
+
+class WriteMetrics:
+    """Counts and latency of the crawler_data bulk upserts"""
+    
+    def __init__(self):
+        self.batches = 0
+        self.rows = 0
+        self.upserted = 0
+        self.modified = 0
+        self.retried = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_batch: Optional[Dict[str, Any]] = None
+    
+    def record(self, rows: int, seconds: float, upserted: int, modified: int, retried: int, errors: int):
+        self.batches += 1
+        self.rows += rows
+        self.upserted += upserted
+        self.modified += modified
+        self.retried += retried
+        self.errors += errors
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_batch = {
+            "rows": rows,
+            "upserted": upserted,
+            "modified": modified,
+            "latency_ms": round(seconds * 1000, 1),
+            "at": datetime.utcnow()
+        }
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "upserted": self.upserted,
+            "modified": self.modified,
+            "retried": self.retried,
+            "errors": self.errors,
+            "avg_latency_ms": round(self.total_seconds / self.batches * 1000, 1) if self.batches else None,
+            "max_latency_ms": round(self.max_seconds * 1000, 1),
+            "last_batch": self.last_batch
+        }
+
+write_metrics = WriteMetrics()
+
+def crawler_data_upserts(data_list: Iterable[CrawlerData]) -> List[UpdateOne]:
+    """One upsert per row, keyed on the unique crawler_data row key"""
+    return [
+        UpdateOne(
+            {key: getattr(data_item, key) for key, _ in CRAWLER_DATA_KEY},
+            {"$set": data_item.dict()},
+            upsert=True
+        )
+        for data_item in data_list
+    ]
+
+async def write_crawler_rows(data_list: List[CrawlerData]) -> Dict[str, Any]:
+    """Upsert a batch of rows in one unordered bulk write and record its latency
+
+    "failed" lists the indexes of the rows that were not written.
+    """
+    operations = crawler_data_upserts(data_list)
+    if not operations:
+        return {"rows": 0, "upserted": 0, "modified": 0, "failed": []}
+    
+    started = time.monotonic()
+    upserted = modified = retried = 0
+    failed = set()
+    try:
+        result = await db.crawler_data.bulk_write(operations, ordered=False)
+        upserted, modified = result.upserted_count, result.modified_count
+    except BulkWriteError as e:
+        details = e.details
+        upserted, modified = details.get("nUpserted", 0), details.get("nModified", 0)
+        write_errors = details.get("writeErrors", [])
+        # Two upserts inserting the same new row race on the unique index, the loser succeeds as an update
+        duplicates = [error["index"] for error in write_errors if error.get("code") == 11000]
+        failed.update(error["index"] for error in write_errors if error.get("code") != 11000)
+        if duplicates:
+            retried = len(duplicates)
+            try:
+                result = await db.crawler_data.bulk_write([operations[index] for index in duplicates], ordered=False)
+                upserted += result.upserted_count
+                modified += result.modified_count
+            except BulkWriteError as retry_error:
+                retry_details = retry_error.details
+                upserted += retry_details.get("nUpserted", 0)
+                modified += retry_details.get("nModified", 0)
+                write_errors = write_errors + retry_details.get("writeErrors", [])
+                failed.update(duplicates[error["index"]] for error in retry_details.get("writeErrors", []))
+            except Exception as retry_error:
+                logger.error(f"Error retrying {retried} crawler_data upserts: {str(retry_error)}")
+                failed.update(duplicates)
+        if failed:
+            message = next((error.get("errmsg") for error in write_errors if error.get("code") != 11000), None)
+            logger.error(f"{len(failed)} of {len(operations)} crawler_data upserts failed: {message or write_errors[-1].get('errmsg')}")
+    
+    seconds = time.monotonic() - started
+    write_metrics.record(len(operations), seconds, upserted, modified, retried, len(failed))
+    return {
+        "rows": len(operations),
+        "upserted": upserted,
+        "modified": modified,
+        "failed": sorted(failed),
+        "latency_ms": round(seconds * 1000, 1)
+    }
+
+async def remove_duplicate_crawler_rows() -> int:
+    """Keep only the latest crawl of every row key, duplicates written before the unique index existed"""
+    duplicates = db.crawler_data.aggregate([
+        {"$sort": {"crawl_timestamp": -1}},
+        {"$group": {
+            "_id": {key: f"${key}" for key, _ in CRAWLER_DATA_KEY},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+    removed = 0
+    async for group in duplicates:
+        result = await db.crawler_data.delete_many({"_id": {"$in": group["ids"][1:]}})
+        removed += result.deleted_count
+    logger.info(f"Removed {removed} duplicate crawler_data rows")
+    return removed
+
+# Crawl History
+# Raw points of every saved row in a time-series collection, kept for HISTORY_RAW_RETENTION
+HISTORY_COLLECTION = "crawler_history"
+HISTORY_RAW_RETENTION = timedelta(days=7)
+# Downsampled copies, one document per row and bucket, each kept for its retention (None keeps it forever)
+HISTORY_ROLLUPS = {
+    "1m": {"collection": "crawler_history_1m", "seconds": 60, "retention": timedelta(days=30)},
+    "1h": {"collection": "crawler_history_1h", "seconds": 3600, "retention": timedelta(days=365)},
+    "1d": {"collection": "crawler_history_1d", "seconds": 86400, "retention": None},
+}
+# Longest time range served from each resolution by the auto resolution of /crawler/history
+HISTORY_AUTO_SPANS = [
+    ("raw", timedelta(hours=6)),
+    ("1m", timedelta(days=3)),
+    ("1h", timedelta(days=90)),
+    ("1d", None),
+]
+EPOCH = datetime(1970, 1, 1)
+
+def bucket_start(timestamp: datetime, seconds: int) -> datetime:
+    """Start of the fixed-size bucket a timestamp falls in"""
+    return timestamp - timedelta(seconds=(timestamp - EPOCH).total_seconds() % seconds)
+
+async def ensure_history_collection():
+    """Create the raw history as a time-series collection, or a plain one on servers without them"""
+    try:
+        await db.create_collection(
+            HISTORY_COLLECTION,
+            timeseries={"timeField": "crawl_timestamp", "metaField": "row", "granularity": "seconds"},
+            expireAfterSeconds=int(HISTORY_RAW_RETENTION.total_seconds())
+        )
+        logger.info(f"Created time-series collection {HISTORY_COLLECTION}")
+    except CollectionInvalid:
+        # Already exists
+        pass
+    except OperationFailure as e:
+        # MongoDB before 5.0, a TTL index expires the raw points instead
+        logger.warning(f"Time-series collections unavailable, using a plain {HISTORY_COLLECTION} collection: {str(e)}")
+        await db[HISTORY_COLLECTION].create_index(
+            [("crawl_timestamp", 1)], name="crawl_timestamp_ttl",
+            expireAfterSeconds=int(HISTORY_RAW_RETENTION.total_seconds())
+        )
+
+def history_point(data_item: CrawlerData) -> Dict[str, Any]:
+    return {
+        "row": {key: getattr(data_item, key) for key, _ in CRAWLER_DATA_KEY},
+        "crawl_timestamp": data_item.crawl_timestamp,
+        "level": data_item.level,
+        "count_current": data_item.count_current,
+        "count_total": data_item.count_total,
+        "accumulated_count": data_item.accumulated_count,
+        "status": data_item.status
+    }
+
+def rollup_update(data_item: CrawlerData, seconds: int) -> UpdateOne:
+    """Fold one row into its bucket of a rollup collection"""
+    key = {key: getattr(data_item, key) for key, _ in CRAWLER_DATA_KEY}
+    key["bucket"] = bucket_start(data_item.crawl_timestamp, seconds)
+    return UpdateOne(key, {
+        "$setOnInsert": {"first_at": data_item.crawl_timestamp},
+        "$set": {
+            "last_at": data_item.crawl_timestamp,
+            "level": data_item.level,
+            "count_current": data_item.count_current,
+            "count_total": data_item.count_total,
+            "status": data_item.status
+        },
+        "$min": {"count_current_min": data_item.count_current},
+        "$max": {"count_current_max": data_item.count_current, "accumulated_count": data_item.accumulated_count},
+        "$inc": {"samples": 1}
+    }, upsert=True)
+
+async def record_history(data_list: List[CrawlerData]):
+    """Append saved rows to the raw history and fold them into every rollup"""
+    if not data_list:
+        return
+    await asyncio.gather(
+        db[HISTORY_COLLECTION].insert_many([history_point(data_item) for data_item in data_list], ordered=False),
+        *(
+            db[rollup["collection"]].bulk_write(
+                [rollup_update(data_item, rollup["seconds"]) for data_item in data_list], ordered=False
+            )
+            for rollup in HISTORY_ROLLUPS.values()
+        )
+    )
+
+def pick_history_resolution(start: datetime, end: datetime, now: datetime) -> str:
+    """Finest resolution that still holds start and keeps the number of points small for the range"""
+    span = end - start
+    for resolution, max_span in HISTORY_AUTO_SPANS:
+        retention = HISTORY_RAW_RETENTION if resolution == "raw" else HISTORY_ROLLUPS[resolution]["retention"]
+        if retention is not None and start < now - retention:
+            continue
+        if max_span is None or span <= max_span:
+            return resolution
+    return "1d"
+
+async def query_history(row_filter: Dict[str, Any], start: datetime, end: datetime, resolution: str,
+                        limit: int) -> List[Dict[str, Any]]:
+    """History points of the matching rows between start and end, oldest first"""
+    if resolution == "raw":
+        query = {f"row.{key}": value for key, value in row_filter.items()}
+        query["crawl_timestamp"] = {"$gte": start, "$lte": end}
+        points = await db[HISTORY_COLLECTION].find(query, {"_id": 0}).sort("crawl_timestamp", 1).to_list(limit)
+        for point in points:
+            point.update(point.pop("row"))
+        return points
+    
+    query = dict(row_filter)
+    query["bucket"] = {"$gte": bucket_start(start, HISTORY_ROLLUPS[resolution]["seconds"]), "$lte": end}
+    return await db[HISTORY_ROLLUPS[resolution]["collection"]].find(query, {"_id": 0}).sort("bucket", 1).to_list(limit)
+
+# Keyword Statistics
+# Per-keyword counters per hour, kept for KEYWORD_BUCKET_RETENTION
+KEYWORD_BUCKET_COLLECTION = "keyword_stats_hourly"
+KEYWORD_BUCKET_SECONDS = 3600
+KEYWORD_BUCKET_RETENTION = timedelta(days=90)
+
+class KeywordAggregator:
+    """Keyword counts of every account's crawls, merged in memory and flushed once per crawl cycle"""
+    
+    def __init__(self):
+        self.totals: Dict[str, Dict[str, Any]] = {}
+        self.buckets: Dict[tuple, Dict[str, Any]] = {}
+    
+    @staticmethod
+    def merge(target: Dict[Any, Dict[str, Any]], key, count: int, accounts: Iterable[str], last_seen: datetime):
+        entry = target.setdefault(key, {"count": 0, "accounts": set(), "last_seen": last_seen})
+        entry["count"] += count
+        entry["accounts"].update(accounts)
+        entry["last_seen"] = max(entry["last_seen"], last_seen)
+    
+    def add(self, keyword_stats: Dict[str, Dict[str, Any]]):
+        """Add the statistics collected by count_keywords for one crawl"""
+        for keyword, stats in keyword_stats.items():
+            bucket = bucket_start(stats["last_seen"], KEYWORD_BUCKET_SECONDS)
+            for target, key in ((self.totals, keyword), (self.buckets, (keyword, bucket))):
+                self.merge(target, key, stats["total_count"], stats["accounts_affected"], stats["last_seen"])
+    
+    async def flush(self):
+        """Write the pending counts with one bulk write per collection"""
+        totals, self.totals = self.totals, {}
+        buckets, self.buckets = self.buckets, {}
+        if not totals and not buckets:
+            return
+        
+        def update(entry: Dict[str, Any], count_field: str, accounts_field: str) -> Dict[str, Any]:
+            # Counts add up and account lists are unioned, concurrent flushes never overwrite each other
+            return {
+                "$inc": {count_field: entry["count"]},
+                "$addToSet": {accounts_field: {"$each": sorted(entry["accounts"])}},
+                "$max": {"last_seen": entry["last_seen"]}
+            }
+        
+        writes = [
+            ("keyword_stats", self.totals, list(totals.items()), [
+                UpdateOne({"keyword": keyword}, update(entry, "total_count", "accounts_affected"), upsert=True)
+                for keyword, entry in totals.items()
+            ]),
+            (KEYWORD_BUCKET_COLLECTION, self.buckets, list(buckets.items()), [
+                UpdateOne({"keyword": keyword, "bucket": bucket}, update(entry, "count", "accounts"), upsert=True)
+                for (keyword, bucket), entry in buckets.items()
+            ])
+        ]
+        # A failed flush may leave counts pending in only one of the collections
+        writes = [write for write in writes if write[3]]
+        results = await asyncio.gather(
+            *(db[collection].bulk_write(operations, ordered=False) for collection, _, _, operations in writes),
+            return_exceptions=True
+        )
+        failed = False
+        for (collection, pending, entries, _), result in zip(writes, results):
+            if not isinstance(result, Exception):
+                continue
+            failed = True
+            logger.error(f"Error saving keyword stats to {collection}: {str(result)}")
+            if isinstance(result, BulkWriteError):
+                # Unordered, every operation except the failed ones was applied
+                entries = [entries[error["index"]] for error in result.details.get("writeErrors", [])]
+            # Keep the counts that were not written for the next flush, applied $inc must not run twice
+            for key, entry in entries:
+                self.merge(pending, key, entry["count"], entry["accounts"], entry["last_seen"])
+        if not failed:
+            logger.info(f"Flushed keyword stats for {len(totals)} keywords, {len(buckets)} hourly buckets")
+
+keyword_aggregator = KeywordAggregator()
+
+# Index Management
+# Every index the API relies on, with the queries it serves
+INDEX_REGISTRY = [
+    {"collection": "crawler_data", "keys": CRAWLER_DATA_KEY, "name": CRAWLER_DATA_KEY_INDEX, "unique": True,
+     "serves": "save_data upserts"},
+    {"collection": "crawler_data", "keys": [("crawl_timestamp", -1)], "name": "crawl_timestamp_desc",
+     "serves": "/crawler/data, /crawler/status latest record, /crawler/data/summary 24h count"},
+    {"collection": "crawler_data", "keys": [("account_username", 1), ("crawl_timestamp", -1)], "name": "account_crawl_timestamp",
+     "serves": "/crawler/data and /crawler/data/export by account"},
+    {"collection": "crawler_data", "keys": [("status", 1), ("crawl_timestamp", -1)], "name": "status_crawl_timestamp",
+     "serves": "/crawler/data by status"},
+    {"collection": "crawler_data", "keys": [("guild", 1), ("crawl_timestamp", -1)], "name": "guild_crawl_timestamp",
+     "serves": "/crawler/data by guild"},
+    {"collection": "crawler_data", "keys": [("count_current", 1)], "name": "count_current",
+     "serves": "/crawler/data count range"},
+    {"collection": "crawler_accounts", "keys": [("username", 1)], "name": "username",
+     "serves": "account lookups, updates and deletes"},
+    {"collection": "crawler_accounts", "keys": [("status", 1)], "name": "status",
+     "serves": "active account counts, scheduling"},
+    {"collection": "keyword_stats", "keys": [("keyword", 1)], "name": "keyword", "unique": True,
+     "serves": "keyword stats upserts"},
+    {"collection": "keyword_stats", "keys": [("total_count", -1)], "name": "total_count_desc",
+     "serves": "/crawler/data/keywords, /crawler/data/summary"},
+    {"collection": KEYWORD_BUCKET_COLLECTION, "keys": [("keyword", 1), ("bucket", 1)], "name": "keyword_bucket_unique",
+     "unique": True, "serves": "keyword stats flush"},
+    {"collection": KEYWORD_BUCKET_COLLECTION, "keys": [("bucket", 1)], "name": "bucket_ttl",
+     "expire_after": int(KEYWORD_BUCKET_RETENTION.total_seconds()), "serves": "/crawler/data/keywords?hours, retention"},
+    {"collection": "crawler_sessions", "keys": [("username", 1)], "name": "username",
+     "serves": "session store"},
+    {"collection": "selector_strategies", "keys": [("target_url", 1)], "name": "target_url",
+     "serves": "login selector strategies"},
+    {"collection": HISTORY_COLLECTION, "keys": [("row.account_username", 1), ("crawl_timestamp", 1)],
+     "name": "row_account_crawl_timestamp", "serves": "/crawler/history raw resolution"},
+]
+for resolution, rollup in HISTORY_ROLLUPS.items():
+    INDEX_REGISTRY.append({
+        "collection": rollup["collection"], "keys": CRAWLER_DATA_KEY + [("bucket", 1)], "name": "row_bucket_unique",
+        "unique": True, "serves": f"history {resolution} rollup upserts"
+    })
+    INDEX_REGISTRY.append({
+        "collection": rollup["collection"], "keys": [("account_username", 1), ("bucket", 1)], "name": "account_bucket",
+        "serves": f"/crawler/history {resolution} resolution"
+    })
+    if rollup["retention"]:
+        INDEX_REGISTRY.append({
+            "collection": rollup["collection"], "keys": [("bucket", 1)], "name": "bucket_ttl",
+            "expire_after": int(rollup["retention"].total_seconds()), "serves": f"{resolution} rollup retention"
+        })
+
+# Representative query of each endpoint, checked by the index report
+QUERY_SHAPES = [
+    {"endpoint": "/crawler/data", "collection": "crawler_data", "filter": {}, "sort": [("crawl_timestamp", -1)]},
+    {"endpoint": "/crawler/data?account_username", "collection": "crawler_data",
+     "filter": {"account_username": "KR666"}, "sort": [("crawl_timestamp", -1)]},
+    {"endpoint": "/crawler/data?status", "collection": "crawler_data",
+     "filter": {"status": "在线"}, "sort": [("crawl_timestamp", -1)]},
+    {"endpoint": "/crawler/data?guild", "collection": "crawler_data",
+     "filter": {"guild": "青帮"}, "sort": [("crawl_timestamp", -1)]},
+    {"endpoint": "/crawler/data?min_count&max_count", "collection": "crawler_data",
+     "filter": {"count_current": {"$gte": 10, "$lte": 20}}, "sort": [("crawl_timestamp", -1)]},
+    {"endpoint": "/crawler/status latest record", "collection": "crawler_data",
+     "filter": {}, "sort": [("crawl_timestamp", -1)], "limit": 1},
+    {"endpoint": "/crawler/data/summary 24h count", "collection": "crawler_data",
+     "filter": {"crawl_timestamp": {"$gte": datetime(2000, 1, 1)}}},
+    {"endpoint": "save_data upsert", "collection": "crawler_data",
+     "filter": {"account_username": "KR666", "sequence_number": 1, "ip": "127.0.0.1"}},
+    {"endpoint": "account lookup", "collection": "crawler_accounts", "filter": {"username": "KR666"}},
+    {"endpoint": "active accounts", "collection": "crawler_accounts", "filter": {"status": "active"}},
+    {"endpoint": "/crawler/data/keywords", "collection": "keyword_stats", "filter": {}, "sort": [("total_count", -1)]},
+    {"endpoint": "/crawler/data/keywords?hours", "collection": KEYWORD_BUCKET_COLLECTION,
+     "filter": {"bucket": {"$gte": datetime(2000, 1, 1)}}},
+    {"endpoint": "session store", "collection": "crawler_sessions", "filter": {"username": "KR666"}},
+    {"endpoint": "selector strategies", "collection": "selector_strategies", "filter": {"target_url": "http://localhost/"}},
+    {"endpoint": "/crawler/history raw", "collection": HISTORY_COLLECTION,
+     "filter": {"row.account_username": "KR666", "crawl_timestamp": {"$gte": datetime(2000, 1, 1)}}, "sort": [("crawl_timestamp", 1)]},
+    {"endpoint": "/crawler/history 1h", "collection": HISTORY_ROLLUPS["1h"]["collection"],
+     "filter": {"account_username": "KR666", "bucket": {"$gte": datetime(2000, 1, 1)}}, "sort": [("bucket", 1)]},
+]
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Build every registered index, existing ones with the same spec are left as they are"""
+    created = {"ok": [], "failed": []}
+    for position, spec in enumerate(INDEX_REGISTRY):
+        collection = db[spec["collection"]]
+        label = f"{spec['collection']}.{spec['name']}"
+        options = {"name": spec["name"], "unique": spec.get("unique", False)}
+        if spec.get("expire_after"):
+            options["expireAfterSeconds"] = spec["expire_after"]
+        try:
+            await collection.create_index(spec["keys"], **options)
+            created["ok"].append(label)
+        except ConnectionFailure as e:
+            logger.error(f"Cannot reach MongoDB to create indexes: {str(e)}")
+            created["failed"].extend(f"{spec['collection']}.{spec['name']}" for spec in INDEX_REGISTRY[position:])
+            break
+        except Exception as e:
+            # An index with the same keys under another name or options, keep going with the rest
+            logger.error(f"Error creating index {label}: {str(e)}")
+            if isinstance(e, OperationFailure) and e.code == 11000 and spec["keys"] == CRAWLER_DATA_KEY:
+                logger.error("crawler_data holds duplicate rows, POST /api/crawler/data/deduplicate removes them")
+            created["failed"].append(label)
+    
+    logger.info(f"Ensured {len(created['ok'])} indexes ({len(created['failed'])} failed)")
+    return created
+
+def plan_stages(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten an explain plan tree into its stages, root first"""
+    stages = [plan]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(plan_stages(child))
+    return stages
+
+async def explain_query_shape(shape: Dict[str, Any]) -> Dict[str, Any]:
+    """Explain one representative query and flag collection scans and in-memory sorts"""
+    cursor = db[shape["collection"]].find(shape["filter"])
+    if shape.get("sort"):
+        cursor = cursor.sort(shape["sort"])
+    cursor = cursor.limit(shape.get("limit", 100))
+    explain = await cursor.explain()
+    
+    stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+    stage_names = [stage["stage"] for stage in stages if "stage" in stage]
+    execution = explain.get("executionStats", {})
+    return {
+        "endpoint": shape["endpoint"],
+        "collection": shape["collection"],
+        "stages": stage_names,
+        "indexes": [stage["indexName"] for stage in stages if "indexName" in stage],
+        "collection_scan": "COLLSCAN" in stage_names,
+        "in_memory_sort": "SORT" in stage_names,
+        "docs_examined": execution.get("totalDocsExamined"),
+        "keys_examined": execution.get("totalKeysExamined"),
+        "returned": execution.get("nReturned")
+    }
+
+# Network Capture
+# Learned JSON source of the table per target URL: response URL, path to the records and the key of each column
+network_table_sources: Dict[str, Dict[str, Any]] = {}
+
+def is_data_response(params: Dict[str, Any]) -> bool:
+    """Whether a Network.responseReceived event is an XHR or fetch that could carry table data"""
+    return params.get("type") in ("XHR", "Fetch") and params.get("response", {}).get("status") == 200
+
+def performance_responses(driver) -> List[tuple]:
+    """(target id, url, request id) of the XHR and fetch responses in chromedriver's performance log
+
+    The log covers every tab of the browser and is drained by each read, webview tells the tabs apart.
+    """
+    responses = []
+    try:
+        entries = driver.get_log("performance")
+    except WebDriverException:
+        # The driver was started without the performance log
+        return responses
+    for entry in entries:
+        log = json.loads(entry["message"])
+        message = log.get("message", {})
+        if message.get("method") == "Network.responseReceived" and is_data_response(message.get("params", {})):
+            responses.append((log.get("webview"), message["params"]["response"]["url"], message["params"]["requestId"]))
+    return responses
+
+def json_record_lists(payload, path: tuple = (), depth: int = 0) -> Iterator[tuple]:
+    """Yield (path, records) for every list of list or dict records in a JSON document"""
+    if isinstance(payload, list):
+        if payload and all(isinstance(item, (list, dict)) for item in payload[:5]):
+            yield path, payload
+        return
+    if isinstance(payload, dict) and depth < 3:
+        for key, value in payload.items():
+            yield from json_record_lists(value, path + (key,), depth + 1)
+
+def record_values(record) -> List[tuple]:
+    """(key, value) pairs of a dict record, (index, value) pairs of a list record"""
+    return list(record.items()) if isinstance(record, dict) else list(enumerate(record))
+
+def json_cell_text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+def decode_table_rows(payload, source: Dict[str, Any]) -> Optional[List[List[str]]]:
+    """Rebuild the table's cell rows (with a placeholder header) from a JSON response"""
+    records = payload
+    for key in source["path"]:
+        if not isinstance(records, dict) or key not in records:
+            return None
+        records = records[key]
+    if not isinstance(records, list):
+        return None
+    
+    rows = [["header"]]  # map_table_rows skips the header row
+    for record in records:
+        if not isinstance(record, (list, dict)):
+            return None
+        values = dict(record_values(record))
+        rows.append(["" if key is None else json_cell_text(values.get(key)) for key in source["columns"]])
+    return rows
+
+def learn_table_source(url: str, payload, dom_rows: List[List[str]]) -> Optional[Dict[str, Any]]:
+    """Find the JSON records behind the table by matching them against the rows read from the DOM"""
+    data_rows = [row for row in dom_rows[1:] if len(row) >= 10]
+    if not data_rows:
+        return None
+    
+    for path, records in json_record_lists(payload):
+        first = record_values(records[0])
+        columns = []
+        for cell in data_rows[0]:
+            key = next((key for key, value in first if json_cell_text(value) == cell), None)
+            if key is None and cell:
+                break
+            columns.append(key)
+        else:
+            source = {"url": url.split("?")[0], "path": list(path), "columns": columns}
+            # Only trust a mapping that reproduces every row of the table
+            decoded = decode_table_rows(payload, source)
+            if decoded and [row for row in decoded[1:] if len(row) >= 10] == data_rows:
+                return source
+    return None
+
+def parse_response_body(body: Dict[str, Any]):
+    """JSON document of a Network.getResponseBody result, None when it is not JSON"""
+    text = body.get("body", "")
+    if body.get("base64Encoded"):
+        text = base64.b64decode(text).decode("utf-8", errors="replace")
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+# Adaptive Scheduling
+class AdaptiveIntervalTracker:
+    """Per-account crawl interval that follows how often the account's rows change"""
+    
+    def __init__(self):
+        self.intervals: Dict[str, float] = {}
+        self.signatures: Dict[str, int] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+    
+    @staticmethod
+    def fold_signature(signature: int, data_list: List[CrawlerData]) -> int:
+        """Fold a batch of rows into the signature of the fields that show an account is making progress"""
+        for item in data_list:
+            signature = hash((signature, item.sequence_number, item.ip, item.count_current, item.status, item.runtime))
+        return signature
+    
+    def interval_for(self, username: str, config: CrawlerConfig) -> float:
+        """Current crawl interval of an account"""
+        if not config.adaptive_interval:
+            return config.crawl_interval
+        return self.intervals.get(username, config.crawl_interval)
+    
+    def observe(self, username: str, signature: int, keywords_seen: bool, config: CrawlerConfig) -> float:
+        """Record a crawl result and return the account's next interval"""
+        previous = self.signatures.get(username)
+        self.signatures[username] = signature
+        
+        changed = previous is not None and previous != signature
+        
+        stats = self.stats.setdefault(username, {"crawls": 0, "changes": 0, "last_change": None})
+        stats["crawls"] += 1
+        if changed:
+            stats["changes"] += 1
+            stats["last_change"] = datetime.utcnow()
+        
+        if not config.adaptive_interval:
+            return config.crawl_interval
+        
+        interval = self.interval_for(username, config)
+        if changed or keywords_seen:
+            interval = max(config.min_crawl_interval, interval / config.interval_backoff)
+        elif previous is not None:
+            interval = min(config.max_crawl_interval, interval * config.interval_backoff)
+        self.intervals[username] = interval
+        return interval
+    
+    def forget(self, username: str):
+        """Drop the state of an account"""
+        self.intervals.pop(username, None)
+        self.signatures.pop(username, None)
+        self.stats.pop(username, None)
+    
+    def reset(self):
+        """Start every account over at the configured interval"""
+        self.intervals.clear()
+
+adaptive_intervals = AdaptiveIntervalTracker()
+
+# Session Store
+class SessionStore:
+    """Login cookies per account, persisted in Mongo so a restart can skip the login"""
+    
+    @staticmethod
+    def session_expiry(cookies: List[Dict[str, Any]], ttl: int) -> datetime:
+        """Expiry of a saved session, the earliest cookie expiry or the configured TTL"""
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+        cookie_expiries = [cookie["expiry"] for cookie in cookies if cookie.get("expiry")]
+        if cookie_expiries:
+            expires_at = min(expires_at, datetime.utcfromtimestamp(min(cookie_expiries)))
+        return expires_at
+    
+    async def save(self, username: str, cookies: List[Dict[str, Any]], data_url: Optional[str], ttl: int):
+        """Save the cookies of a successful login"""
+        try:
+            await db.crawler_sessions.update_one(
+                {"username": username},
+                {"$set": {
+                    "username": username,
+                    "cookies": cookies,
+                    "data_url": data_url,
+                    "expires_at": self.session_expiry(cookies, ttl),
+                    "saved_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+            logger.info(f"Saved {len(cookies)} session cookies for account: {username}")
+        except Exception as e:
+            logger.error(f"Error saving session for account {username}: {str(e)}")
+    
+    async def load(self, username: str) -> Optional[Dict[str, Any]]:
+        """Load a saved session that has not expired yet"""
+        try:
+            return await db.crawler_sessions.find_one({
+                "username": username,
+                "expires_at": {"$gt": datetime.utcnow()}
+            })
+        except Exception as e:
+            logger.error(f"Error loading session for account {username}: {str(e)}")
+            return None
+    
+    async def delete(self, username: str):
+        """Forget the saved session of an account"""
+        await db.crawler_sessions.delete_one({"username": username})
+
+session_store = SessionStore()
+
+def row_fingerprint(data_item: CrawlerData) -> str:
+    """Content fingerprint of a row, ignoring its id and crawl time"""
+    content = json.dumps(data_item.dict(exclude={"id", "crawl_timestamp"}), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+# Accumulation State
+def row_key(account_username: str, sequence_number: int, ip: str) -> str:
+    return f"{account_username}_{sequence_number}_{ip}"
+
+class AccumulationStore:
+    """Last saved count_current and accumulated_count per row key, shared by every crawler instance"""
+    
+    def __init__(self, max_rows: int = 200000):
+        self.max_rows = max_rows
+        # Least recently used rows first
+        self.rows: "OrderedDict[str, tuple]" = OrderedDict()
+        self.row_accounts: Dict[str, str] = {}
+        # Accounts whose saved rows are all in memory
+        self.loaded: set = set()
+        # accumulate_data runs in executor threads
+        self.lock = threading.Lock()
+    
+    async def load(self, username: str):
+        """Bulk-load an account's saved rows with one query, unless they are already in memory"""
+        if username in self.loaded:
+            return
+        cursor = db.crawler_data.find(
+            {"account_username": username},
+            {"_id": 0, "sequence_number": 1, "ip": 1, "count_current": 1, "accumulated_count": 1}
+        )
+        rows = await cursor.to_list(None)
+        with self.lock:
+            for row in rows:
+                self.put(row_key(username, row["sequence_number"], row["ip"]), username,
+                         row.get("count_current", 0), row.get("accumulated_count", 0))
+            self.loaded.add(username)
+            self.evict()
+        logger.info(f"Loaded accumulation state of {len(rows)} rows for account {username}")
+    
+    def put(self, key: str, username: str, count_current: int, accumulated_count: int):
+        self.rows[key] = (count_current, accumulated_count)
+        self.rows.move_to_end(key)
+        self.row_accounts[key] = username
+    
+    def evict(self):
+        while len(self.rows) > self.max_rows:
+            key, _ = self.rows.popitem(last=False)
+            # The account's state is incomplete now, its next crawl loads it again
+            self.loaded.discard(self.row_accounts.pop(key, None))
+    
+    def get(self, key: str) -> Optional[tuple]:
+        """(count_current, accumulated_count) of the last saved row"""
+        with self.lock:
+            state = self.rows.get(key)
+            if state is not None:
+                self.rows.move_to_end(key)
+            return state
+    
+    def remember(self, data_list: Iterable[CrawlerData]):
+        """Record rows that were written to crawler_data"""
+        with self.lock:
+            for data_item in data_list:
+                key = row_key(data_item.account_username, data_item.sequence_number, data_item.ip)
+                self.put(key, data_item.account_username, data_item.count_current, data_item.accumulated_count)
+            self.evict()
+
+accumulation_state = AccumulationStore()
+
+# HTTP Fast Path
+HTTP_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+class XiaoBaHttpSession:
+    """Browserless crawl path that replays the 师门 login form with a per-account cookie jar"""
+    
+    def __init__(self, account: CrawlerAccount, config: CrawlerConfig):
+        self.account = account
+        self.config = config
+        self.client: Optional[httpx.AsyncClient] = None
+        self.logged_in = False
+        self.data_url: Optional[str] = None
+        self.retry_after: Optional[datetime] = None
+        self.restore_attempted = False
+    
+    def get_client(self) -> httpx.AsyncClient:
+        """Get the account's HTTP client, its cookie jar holds the login session"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=self.config.timeout,
+                headers={"User-Agent": HTTP_USER_AGENT}
+            )
+        return self.client
+    
+    def export_cookies(self) -> List[Dict[str, Any]]:
+        """Export the cookie jar in the Selenium cookie format used by the session store"""
+        cookies = []
+        for cookie in self.get_client().cookies.jar:
+            item = {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": cookie.secure
+            }
+            if cookie.expires:
+                item["expiry"] = int(cookie.expires)
+            cookies.append(item)
+        return cookies
+    
+    async def restore(self) -> bool:
+        """Restore a saved login session into the cookie jar"""
+        self.restore_attempted = True
+        saved = await session_store.load(self.account.username)
+        if not saved or not saved.get("data_url"):
+            return False
+        
+        client = self.get_client()
+        for cookie in saved["cookies"]:
+            client.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+        self.data_url = saved["data_url"]
+        self.logged_in = True
+        logger.info(f"Restored saved HTTP session for account: {self.account.username}")
+        return True
+    
+    @staticmethod
+    def has_login_form(html: str) -> bool:
+        """Check whether a page still shows the password field of the login form"""
+        return re.search(r'<input[^>]+type=["\']?password', html, re.IGNORECASE) is not None
+    
+    def build_login_form(self, html: str, page_url: str):
+        """Build (method, action, fields) for the 师门 login from the login page HTML"""
+        soup = BeautifulSoup(html, 'html.parser')
+        password_input = soup.find('input', attrs={'type': re.compile('^password$', re.I)})
+        if not password_input:
+            return None
+        
+        form = password_input.find_parent('form')
+        scope = form or soup
+        fields = {}
+        username_name = None
+        
+        for element in scope.find_all(['input', 'select', 'textarea', 'button']):
+            name = element.get('name')
+            if not name:
+                continue
+            
+            if element.name == 'select':
+                options = element.find_all('option')
+                chosen = next((option for option in options if '师门' in option.get_text()), None) or \
+                    next((option for option in options if option.has_attr('selected')), None) or \
+                    (options[0] if options else None)
+                if chosen is not None:
+                    fields[name] = chosen.get('value', chosen.get_text(strip=True))
+                continue
+            
+            if element.name == 'button':
+                # A named 师门 button selects the login type
+                if '师门' in element.get_text():
+                    fields[name] = element.get('value', element.get_text(strip=True))
+                continue
+            
+            input_type = (element.get('type') or 'text').lower()
+            value = element.get('value', '')
+            if input_type in ('submit', 'button', 'image', 'reset', 'file'):
+                if '师门' in value:
+                    fields[name] = value
+            elif input_type in ('radio', 'checkbox'):
+                if '师门' in value or (element.has_attr('checked') and name not in fields):
+                    fields[name] = value or 'on'
+            elif input_type == 'password':
+                fields[name] = self.account.password
+            else:
+                if username_name is None and input_type in ('text', 'email') and \
+                        name.lower() in ('username', 'user', 'account', 'name'):
+                    username_name = name
+                fields[name] = value
+        
+        if username_name is None:
+            # Fall back to the first visible text field
+            text_input = scope.find('input', attrs={'type': re.compile('^(text|email)$', re.I)}) or \
+                scope.find('input', attrs={'type': None})
+            username_name = text_input.get('name') if text_input else 'username'
+        fields[username_name] = self.account.username
+        
+        # Fields the login page sets from script, e.g. the 师门 login type
+        fields.update(self.config.http_login_fields)
+        
+        action = urljoin(page_url, form.get('action') or '') if form else page_url
+        method = (form.get('method') or 'post').lower() if form else 'post'
+        return method, action, fields
+    
+    async def login(self) -> Optional[str]:
+        """Submit the 师门 login form and return the HTML of the page behind it"""
+        client = self.get_client()
+        response = await client.get(self.config.target_url)
+        response.raise_for_status()
+        
+        login_form = self.build_login_form(response.text, str(response.url))
+        if not login_form:
+            logger.warning(f"HTTP fast path found no login form for account: {self.account.username}")
+            return None
+        
+        method, action, fields = login_form
+        if method == 'get':
+            response = await client.get(action, params=fields)
+        else:
+            response = await client.post(action, data=fields)
+        
+        if response.status_code >= 400 or self.has_login_form(response.text):
+            logger.warning(f"HTTP fast path login failed for account: {self.account.username}")
+            return None
+        
+        self.logged_in = True
+        self.data_url = str(response.url)
+        logger.info(f"HTTP fast path logged in with account: {self.account.username}")
+        await session_store.save(self.account.username, self.export_cookies(), self.data_url, self.config.session_ttl)
+        return response.text
+    
+    async def fetch_table_data(self) -> Optional[Iterator[List[str]]]:
+        """Fetch the table over HTTP and return its rows lazily, None when the browser path is needed"""
+        try:
+            html = None
+            if not self.logged_in and not self.restore_attempted:
+                await self.restore()
+            
+            if self.logged_in and self.data_url:
+                response = await self.get_client().get(self.data_url)
+                if response.status_code == 200 and not self.has_login_form(response.text):
+                    html = response.text
+                else:
+                    logger.info(f"HTTP session expired for account {self.account.username}, logging in again")
+                    self.logged_in = False
+            
+            if html is None:
+                html = await self.login()
+                if html is None:
+                    return None
+            
+            # Parse up to the first data row off the event loop, the rest is parsed as the pipeline pulls it
+            rows = iter_table_rows(html, self.config.html_parser)
+            loop = asyncio.get_running_loop()
+            head = await loop.run_in_executor(None, take_batch, rows, 2)
+            if len(head) < 2:
+                logger.warning(f"HTTP fast path found no table rows for account: {self.account.username}")
+                return None
+            return itertools.chain(head, rows)
+            
+        except httpx.HTTPError as e:
+            logger.warning(f"HTTP fast path error for account {self.account.username}: {str(e)}")
+            self.logged_in = False
+            return None
+    
+    async def aclose(self):
+        """Close the HTTP client and drop its cookies"""
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+        self.logged_in = False
+        self.restore_attempted = False
+
+# Login Helpers
+SHIMEN_BUTTON_STRATEGIES = [
+    ("exact_text", (By.XPATH, "//button[normalize-space(text())='师门']")),
+    ("input_value", (By.XPATH, "//input[@type='button' and @value='师门']")),
+    ("contains_text", (By.XPATH, "//*[contains(text(), '师门') and (name()='button' or name()='input' or name()='a' or name()='div')]")),
+    ("scan", (By.XPATH, "//button[contains(., '师门')] | //input[contains(@value, '师门')]")),
+]
+
+USERNAME_FIELD_STRATEGIES = [
+    *[(f"name:{name}", (By.NAME, name)) for name in ['username', 'user', 'account', 'name']],
+    *[(f"id:{name}", (By.ID, name)) for name in ['username', 'user', 'account', 'name']],
+    ("input_type", (By.XPATH, "//input[@type='text' or @type='email']")),
+]
+
+PASSWORD_FIELD_STRATEGIES = [
+    ("name:password", (By.NAME, "password")),
+    ("id:password", (By.ID, "password")),
+    ("input_type", (By.XPATH, "//input[@type='password']")),
+]
+
+SUBMIT_BUTTON_STRATEGIES = [
+    ("submit", (By.CSS_SELECTOR, "button[type='submit'], input[type='submit']")),
+    ("button_text", (By.XPATH, "//button[contains(text(), '登录') or contains(text(), '登錄') or contains(text(), 'Login')]")),
+    ("input_value", (By.XPATH, "//input[@value='登录' or @value='登錄' or @value='Login']")),
+    ("scan", (By.XPATH, "//button[contains(., '登录') or contains(., '登錄') or contains(translate(., 'LOGIN', 'login'), 'login') or contains(., '确定') or contains(., '提交')]"
+                        " | //input[(@type='button' or @type='submit') and (contains(@value, '登录') or contains(@value, '登錄') or contains(translate(@value, 'LOGIN', 'login'), 'login') or contains(@value, '确定') or contains(@value, '提交'))]")),
+]
+
+class LoginBudget:
+    """Time budget of one login, shared by all of its waits, with per-step timings"""
+    
+    def __init__(self, seconds: float):
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds
+        self.step_started = self.started
+        self.timings: Dict[str, float] = {}
+    
+    def remaining(self, cap: Optional[float] = None) -> float:
+        """Seconds left in the budget, optionally capped for a single step"""
+        remaining = max(0.0, self.deadline - time.monotonic())
+        return min(remaining, cap) if cap is not None else remaining
+    
+    def wait(self, driver, condition, cap: Optional[float] = None):
+        """Wait for a DOM condition within the remaining budget"""
+        return WebDriverWait(
+            driver, self.remaining(cap), poll_frequency=0.1,
+            ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)
+        ).until(condition)
+    
+    def mark(self, step: str):
+        """Record the time spent since the previous step"""
+        now = time.monotonic()
+        self.timings[step] = round(now - self.step_started, 3)
+        self.step_started = now
+    
+    def elapsed(self) -> float:
+        return round(time.monotonic() - self.started, 3)
+
+class SelectorStrategyCache:
+    """Remembers which selector strategy found each login element, persisted per target URL"""
+    
+    def __init__(self):
+        self.strategies: Dict[str, Dict[str, str]] = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+    
+    async def load(self, target_url: str):
+        """Load the learned strategies of a target URL once"""
+        if target_url in self.strategies:
+            return
+        try:
+            doc = await db.selector_strategies.find_one({"target_url": target_url})
+            with self.lock:
+                self.strategies.setdefault(target_url, dict(doc["strategies"]) if doc else {})
+        except Exception as e:
+            logger.error(f"Error loading selector strategies: {str(e)}")
+    
+    def ordered(self, target_url: str, element: str, strategies):
+        """Strategies with the one that worked last time first"""
+        learned = self.strategies.get(target_url, {}).get(element)
+        return sorted(strategies, key=lambda strategy: strategy[0] != learned)
+    
+    def record(self, target_url: str, element: str, strategy: str):
+        """Remember the strategy that found an element, replacing one that stopped matching"""
+        with self.lock:
+            learned = self.strategies.setdefault(target_url, {})
+            if learned.get(element) != strategy:
+                if element in learned:
+                    logger.info(f"Page layout changed: {element} now found by {strategy} instead of {learned[element]}")
+                learned[element] = strategy
+                self.dirty.add(target_url)
+    
+    def forget(self, target_url: str, element: str):
+        """Drop a learned strategy after no strategy matched"""
+        with self.lock:
+            if self.strategies.get(target_url, {}).pop(element, None):
+                self.dirty.add(target_url)
+    
+    async def flush(self):
+        """Persist strategies that changed since the last flush"""
+        with self.lock:
+            changed = {url: dict(self.strategies.get(url, {})) for url in self.dirty}
+            self.dirty.clear()
+        for target_url, strategies in changed.items():
+            try:
+                await db.selector_strategies.update_one(
+                    {"target_url": target_url},
+                    {"$set": {"target_url": target_url, "strategies": strategies, "updated_at": datetime.utcnow()}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Error saving selector strategies: {str(e)}")
+
+selector_strategies = SelectorStrategyCache()
+
+# Collects compact descriptors of candidate elements in one WebDriver round-trip
+DOM_PROBE_SCRIPT = """
+var tags = arguments[0], needle = arguments[1], limit = arguments[2];
+var results = [];
+for (var t = 0; t < tags.length && results.length < limit; t++) {
+    var elements = document.getElementsByTagName(tags[t]);
+    for (var i = 0; i < elements.length && results.length < limit; i++) {
+        var el = elements[i];
+        var text = (el.innerText || '').trim();
+        var value = (el.value === undefined || el.value === null) ? '' : String(el.value);
+        if (needle && text.indexOf(needle) === -1 && value.indexOf(needle) === -1) {
+            continue;
+        }
+        results.push({
+            tag: el.tagName.toLowerCase(),
+            text: text.slice(0, 200),
+            value: value.slice(0, 200),
+            class: el.getAttribute('class') || '',
+            id: el.id || '',
+            visible: !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length),
+            handle: el
+        });
+    }
+}
+return results;
+"""
+
+def probe_elements(driver, tags=("button", "input", "a", "div"), contains: Optional[str] = None,
+                   limit: int = 500) -> List[Dict[str, Any]]:
+    """Describe candidate elements (tag, text, value, class, id, handle) with a single in-page script"""
+    return driver.execute_script(DOM_PROBE_SCRIPT, list(tags), contains, limit) or []
+
+def page_ready(driver):
+    """Wait condition: the document finished loading"""
+    return driver.execute_script("return document.readyState") == "complete"
+
+def first_match(strategies, clickable: bool = False):
+    """Wait condition returning (strategy name, element) for the first strategy that matches"""
+    def condition(driver):
+        for name, locator in strategies:
+            for element in driver.find_elements(*locator):
+                if not clickable or (element.is_displayed() and element.is_enabled()):
+                    return name, element
+        return False
+    return condition
+
+def login_confirmed(target_url: str):
+    """Wait condition: redirected away from the login page or the login form is gone"""
+    def condition(driver):
+        return driver.current_url != target_url or len(driver.find_elements(By.NAME, "username")) == 0
+    return condition
+
+# Resource Blocking
+# URL patterns per resource type that the login and table pages don't need
+RESOURCE_BLOCK_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav", "*.m3u8"],
+    "stylesheet": ["*.css"],
+    "analytics": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*hm.baidu.com*",
+        "*cnzz.com*", "*51.la*", "*umeng.com*"
+    ],
+}
+
+def blocked_resource_types(config: CrawlerConfig) -> List[str]:
+    """Configured resource types to block, minus the types on the allowlist"""
+    return [
+        resource for resource in config.block_resources
+        if resource in RESOURCE_BLOCK_PATTERNS and resource not in config.resource_allowlist
+    ]
+
+def allowed_url_patterns(config: CrawlerConfig) -> List[str]:
+    """Allowlist entries that are URL patterns rather than resource types"""
+    return [entry for entry in config.resource_allowlist if entry not in RESOURCE_BLOCK_PATTERNS]
+
+def resource_prefs(config: CrawlerConfig) -> Dict[str, Any]:
+    """Chrome prefs that stop blocked resources before any request is made"""
+    prefs = {}
+    # The image content setting can't exempt single URLs, leave allowlisted images to CDP blocking
+    if "image" in blocked_resource_types(config) and not allowed_url_patterns(config):
+        prefs["profile.managed_default_content_settings.images"] = 2
+    return prefs
+
+def blocked_url_params(config: CrawlerConfig) -> Optional[tuple]:
+    """Network.setBlockedURLs params of the resource policy, (params, params for older Chromium) or None"""
+    blocked = [
+        pattern for resource in blocked_resource_types(config) for pattern in RESOURCE_BLOCK_PATTERNS[resource]
+    ]
+    if not blocked:
+        return None
+    
+    allowed = allowed_url_patterns(config)
+    # First matching pattern wins, so allowlisted URLs go first
+    params = {"urlPatterns": (
+        [{"urlPattern": pattern, "block": False} for pattern in allowed] +
+        [{"urlPattern": pattern, "block": True} for pattern in blocked]
+    )}
+    # Older Chromium only takes plain block patterns; allowlisted URLs stay loadable
+    # by not blocking the patterns they would match
+    fallback = {"urls": [pattern for pattern in blocked if not any(fnmatch.fnmatch(url, pattern) for url in allowed)]}
+    return params, fallback
+
+def apply_resource_policy(driver, config: CrawlerConfig):
+    """Block the configured resource types for every request of a driver through CDP"""
+    block_params = blocked_url_params(config)
+    if not block_params:
+        return
+    
+    params, fallback = block_params
+    driver.execute_cdp_cmd("Network.enable", {})
+    try:
+        driver.execute_cdp_cmd("Network.setBlockedURLs", params)
+    except WebDriverException:
+        driver.execute_cdp_cmd("Network.setBlockedURLs", fallback)
+    logger.info(f"Blocking {', '.join(blocked_resource_types(config))} resources")
+
+# Chrome Drivers
+def process_tree_rss(pid: int) -> Optional[int]:
+    """Resident memory in bytes of a process and all of its descendants, None without psutil"""
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(pid)
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss
+    except psutil.Error:
+        return None
+
+CHROMIUM_BINARY = "/usr/bin/chromium"
+
+def chrome_arguments(config: CrawlerConfig) -> List[str]:
+    """Command line switches of crawler browsers, shared by the Selenium and CDP backends"""
+    arguments = [
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        "--disable-gpu",
+        "--window-size=1920,1080",
+        f"--user-agent={HTTP_USER_AGENT}",
+        "--disable-blink-features=AutomationControlled",
+    ]
+    if config.headless:
+        arguments.insert(0, "--headless")
+    return arguments
+
+def create_chrome_driver(config: CrawlerConfig):
+    """Start Chrome with the crawler options and resource policy"""
+    chrome_options = Options()
+    for argument in chrome_arguments(config):
+        chrome_options.add_argument(argument)
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    prefs = resource_prefs(config)
+    if prefs:
+        chrome_options.add_experimental_option("prefs", prefs)
+    if config.network_capture:
+        # Network events in the performance log let the table be read from its XHR response
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    
+    # Use system Chromium
+    chrome_options.binary_location = CHROMIUM_BINARY
+    
+    try:
+        # Use system ChromeDriver directly without webdriver_manager
+        service = Service("/usr/bin/chromedriver")
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        logger.info("Chrome driver setup successful using system Chromium and ChromeDriver")
+    except Exception as e:
+        logger.error(f"Error setting up Chrome driver: {str(e)}")
+        raise e
+    
+    driver.set_page_load_timeout(config.timeout)
+    # Execute script to remove webdriver property
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    
+    # Skip the configured resource types (images, fonts, media and trackers by default) on every page load
+    try:
+        apply_resource_policy(driver, config)
+    except WebDriverException as e:
+        logger.warning(f"Could not apply resource blocking: {str(e)}")
+    return driver
+
+def driver_signature(config: CrawlerConfig) -> tuple:
+    """The config fields a launched driver depends on, pooled drivers must match them"""
+    return (
+        config.headless, config.timeout, tuple(config.block_resources), tuple(config.resource_allowlist),
+        config.network_capture
+    )
+
+def quit_driver(driver):
+    """Quit a driver, ignoring one that already died"""
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"Error quitting pooled driver: {str(e)}")
+
+class WarmDriverPool:
+    """Pre-launched idle Chrome drivers, so new sessions don't wait for browser startup"""
+    
+    def __init__(self):
+        self.idle: deque = deque()  # (signature, driver, started_at)
+        self.lock = threading.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fill_task: Optional[asyncio.Task] = None
+        self.config: Optional[CrawlerConfig] = None
+    
+    def start(self, config: CrawlerConfig):
+        """Bind the pool to the running loop and fill it in the background"""
+        self.loop = asyncio.get_running_loop()
+        self.start_fill(config)
+    
+    def top_up(self, config: CrawlerConfig):
+        """Refill the pool in the background, safe to call from browser worker threads"""
+        if self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.start_fill, config)
+    
+    def start_fill(self, config: CrawlerConfig):
+        """Start the fill task unless one is already running, it picks up the latest config"""
+        self.config = config
+        if self.fill_task is None or self.fill_task.done():
+            self.fill_task = asyncio.create_task(self.fill())
+    
+    @staticmethod
+    def healthy(driver) -> bool:
+        """Health check of an idle driver, one cheap WebDriver round-trip"""
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+    
+    def checkout(self, config: CrawlerConfig) -> Optional[tuple]:
+        """Take a healthy idle driver matching the config, returns (driver, started_at) or None"""
+        signature = driver_signature(config)
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                pooled_signature, driver, started_at = self.idle.popleft()
+            
+            age = (datetime.utcnow() - started_at).total_seconds()
+            if pooled_signature != signature or (config.browser_max_age and age > config.browser_max_age):
+                quit_driver(driver)
+            elif self.healthy(driver):
+                logger.info(f"Checked out a warm driver, {len(self.idle)} left in the pool")
+                return driver, started_at
+            else:
+                logger.warning("Discarding dead driver from the warm pool")
+                quit_driver(driver)
+    
+    async def fill(self):
+        """Launch drivers one at a time until the pool holds warm_pool_size of the current config"""
+        loop = asyncio.get_running_loop()
+        while self.config:
+            config = self.config
+            signature = driver_signature(config)
+            with self.lock:
+                stale = [entry for entry in self.idle if entry[0] != signature]
+                for entry in stale:
+                    self.idle.remove(entry)
+                # Context mode and the CDP backend don't take drivers from the pool
+                pooled = config.browser_backend == "selenium" and not config.browser_contexts
+                missing = (config.warm_pool_size if pooled else 0) - len(self.idle)
+            for _, driver, _ in stale:
+                await loop.run_in_executor(None, quit_driver, driver)
+            if missing <= 0:
+                return
+            
+            try:
+                driver = await loop.run_in_executor(None, create_chrome_driver, config)
+            except Exception as e:
+                logger.error(f"Warm driver pool could not launch Chrome: {str(e)}")
+                return
+            with self.lock:
+                self.idle.append((signature, driver, datetime.utcnow()))
+    
+    async def close_all(self):
+        """Quit every idle driver"""
+        self.config = None
+        if self.fill_task and not self.fill_task.done():
+            self.fill_task.cancel()
+        with self.lock:
+            drivers = [driver for _, driver, _ in self.idle]
+            self.idle.clear()
+        loop = asyncio.get_running_loop()
+        for driver in drivers:
+            await loop.run_in_executor(None, quit_driver, driver)
+
+warm_driver_pool = WarmDriverPool()
+
+class SharedBrowserHost:
+    """One Chromium process hosting several accounts, one isolated browser context each"""
+    
+    def __init__(self, driver):
+        self.driver = driver
+        # WebDriver commands act on the current window, the lock is held for one command at a time
+        self.lock = threading.RLock()
+        # Tab of the context a worker thread is running for, set by BrowserContext.run
+        self.active = threading.local()
+        self.raw_execute = driver.execute
+        # Every WebDriver command, element commands included, goes through driver.execute
+        driver.execute = self.execute
+        self.default_handle = driver.current_window_handle
+        self.current_handle = self.default_handle
+        self.contexts: Dict[str, "BrowserContext"] = {}
+        # Captured data responses per context tab, one context's performance log read returns every tab's
+        self.responses: Dict[str, List[tuple]] = {}
+        self.started_at = datetime.utcnow()
+        self.rss: Optional[int] = None
+        self.measured_at: Optional[datetime] = None
+        # Why the host takes no new contexts, it quits once its last context closed
+        self.retiring: Optional[str] = None
+    
+    def execute(self, driver_command: str, params: Optional[Dict[str, Any]] = None):
+        """Send one WebDriver command to the calling thread's tab, holding the host only for that command"""
+        handle = getattr(self.active, "handle", None)
+        try:
+            with self.lock:
+                if handle:
+                    self.switch_to(handle)
+                return self.raw_execute(driver_command, params)
+        finally:
+            # Locks are not fair, let a waiting context's command go before our next one
+            time.sleep(0)
+    
+    def take_responses(self, target_id: str) -> List[tuple]:
+        """(url, request id) of a tab's data responses, keeping the other tabs' for their next read"""
+        with self.lock:
+            for webview, url, request_id in performance_responses(self.driver):
+                if webview in self.responses:
+                    self.responses[webview].append((url, request_id))
+            responses = self.responses.get(target_id, [])
+            if target_id in self.responses:
+                self.responses[target_id] = []
+            return responses
+    
+    def switch_to(self, handle: str):
+        """Make a tab the target of WebDriver commands, callers hold the lock"""
+        if self.current_handle != handle:
+            self.raw_execute(Command.SWITCH_TO_WINDOW, {"handle": handle})
+            self.current_handle = handle
+
+class BrowserContext:
+    """An account's isolated cookie jar and tab inside a shared Chromium"""
+    
+    def __init__(self, host: SharedBrowserHost, context_id: str, handle: str, target_id: str):
+        self.host = host
+        self.context_id = context_id
+        self.handle = handle
+        # DevTools target of the tab, the webview of its performance log entries
+        self.target_id = target_id
+    
+    def run(self, func, *args, **kwargs):
+        """Run WebDriver work against this context's tab, other contexts' commands interleave between ours"""
+        active = self.host.active
+        previous = getattr(active, "handle", None)
+        active.handle = self.handle
+        try:
+            return func(*args, **kwargs)
+        finally:
+            active.handle = previous
+
+class BrowserContextPool:
+    """Spreads accounts over a few shared Chromium processes through CDP browser contexts"""
+    
+    # Seconds between process-tree memory measurements of a host
+    MEASURE_INTERVAL = 30
+    
+    def __init__(self):
+        self.hosts: List[SharedBrowserHost] = []
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def retire_reason(host, config: CrawlerConfig) -> Optional[str]:
+        """Why a shared browser (SharedBrowserHost or CdpBrowser) should take no more contexts, None within the host limits"""
+        if config.browser_max_age:
+            age = (datetime.utcnow() - host.started_at).total_seconds()
+            if age > config.browser_max_age:
+                return f"age {round(age)}s > {config.browser_max_age}s"
+        if config.shared_browser_max_rss_mb and host.rss:
+            rss_mb = host.rss / (1024 * 1024)
+            if rss_mb > config.shared_browser_max_rss_mb:
+                return f"memory {round(rss_mb)}MB > {config.shared_browser_max_rss_mb}MB"
+        return None
+    
+    def refresh(self, host: SharedBrowserHost, config: CrawlerConfig) -> Optional[str]:
+        """Measure a host now and then and mark it retiring once it crossed a limit"""
+        if host.retiring:
+            return host.retiring
+        now = datetime.utcnow()
+        if host.measured_at is None or (now - host.measured_at).total_seconds() >= self.MEASURE_INTERVAL:
+            host.rss = BrowserGovernor.driver_rss(host.driver)
+            host.measured_at = now
+        reason = self.retire_reason(host, config)
+        if reason:
+            host.retiring = reason
+            logger.info(f"Retiring shared browser with {len(host.contexts)} contexts: {reason}")
+        return reason
+    
+    def pick_host(self, config: CrawlerConfig) -> SharedBrowserHost:
+        """The least loaded live host with room for another context, launching one when all are full"""
+        with self.lock:
+            for host in list(self.hosts):
+                if not WarmDriverPool.healthy(host.driver):
+                    logger.warning(f"Dropping dead shared browser with {len(host.contexts)} contexts")
+                    self.hosts.remove(host)
+                    quit_driver(host.driver)
+            candidates = [
+                host for host in self.hosts
+                if len(host.contexts) < max(1, config.accounts_per_browser) and not self.refresh(host, config)
+            ]
+            if candidates:
+                return min(candidates, key=lambda host: len(host.contexts))
+            
+            host = SharedBrowserHost(create_chrome_driver(config))
+            self.hosts.append(host)
+            logger.info(f"Launched shared browser {len(self.hosts)} for browser contexts")
+            return host
+    
+    def open(self, config: CrawlerConfig) -> BrowserContext:
+        """Create an isolated browser context with one tab for an account"""
+        host = self.pick_host(config)
+        with host.lock:
+            driver = host.driver
+            known_handles = set(driver.window_handles)
+            context_id = driver.execute_cdp_cmd("Target.createBrowserContext", {"disposeOnDetach": False})["browserContextId"]
+            target_id = driver.execute_cdp_cmd(
+                "Target.createTarget", {"url": "about:blank", "browserContextId": context_id}
+            )["targetId"]
+            handle = next(iter(set(driver.window_handles) - known_handles))
+            context = BrowserContext(host, context_id, handle, target_id)
+            host.contexts[context_id] = context
+            host.responses[target_id] = []
+            
+            # Per-tab setup that create_chrome_driver did for the default tab
+            host.switch_to(handle)
+            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            try:
+                apply_resource_policy(driver, config)
+            except WebDriverException as e:
+                logger.warning(f"Could not apply resource blocking to browser context: {str(e)}")
+        return context
+    
+    def close(self, context: BrowserContext):
+        """Dispose a context, quitting its host when no accounts are left on it"""
+        host = context.host
+        with host.lock:
+            host.contexts.pop(context.context_id, None)
+            host.responses.pop(context.target_id, None)
+            try:
+                host.driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context.context_id})
+                host.switch_to(host.default_handle)
+            except Exception as e:
+                logger.warning(f"Error disposing browser context: {str(e)}")
+            empty = not host.contexts
+        
+        if empty:
+            with self.lock:
+                if host in self.hosts and not host.contexts:
+                    self.hosts.remove(host)
+                    quit_driver(host.driver)
+    
+    def usage(self) -> List[Dict[str, Any]]:
+        """Shared browsers with their context count and process-tree memory"""
+        hosts = []
+        for host in list(self.hosts):
+            rss = BrowserGovernor.driver_rss(host.driver)
+            hosts.append({
+                "contexts": len(host.contexts),
+                "age_seconds": round((datetime.utcnow() - host.started_at).total_seconds()),
+                "rss_mb": round(rss / (1024 * 1024), 1) if rss else None,
+                "retiring": host.retiring
+            })
+        return hosts
+
+browser_contexts = BrowserContextPool()
+
+# Debug Screenshots
+class LoginCapture:
+    """Screenshot hook of one login, only captures what the screenshot policy asks for"""
+    
+    def __init__(self, recorder: "ScreenshotRecorder", driver, username: str, config: CrawlerConfig,
+                 steps: bool, failures: bool):
+        self.recorder = recorder
+        self.driver = driver
+        self.username = username
+        self.config = config
+        self.steps = steps
+        self.failures = failures
+    
+    def wants(self, failure: bool = False) -> bool:
+        """Whether the screenshot policy asks for a step or failure capture of this login"""
+        return self.failures if failure else self.steps
+    
+    def __call__(self, step: str, failure: bool = False):
+        """Capture the current page, the PNG is written by the background writer"""
+        if not self.wants(failure):
+            return
+        try:
+            png = self.driver.get_screenshot_as_png()
+        except Exception as e:
+            logger.warning(f"Error capturing {step} screenshot for {self.username}: {str(e)}")
+            return
+        self.recorder.submit(self.username, step, png, self.config)
+
+class ScreenshotRecorder:
+    """Background writer of login screenshots into a size-bounded ring buffer directory"""
+    
+    def __init__(self):
+        self.queue: "queue.Queue" = queue.Queue(maxsize=32)
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        self.logins = 0
+        # Ring buffer index of the writer thread, (name, size) oldest first
+        self.directory: Optional[str] = None
+        self.files: deque = deque()
+        self.total_bytes = 0
+    
+    def for_login(self, driver, username: str, config: CrawlerConfig) -> LoginCapture:
+        """Screenshot hook for one login, deciding up front whether this login is sampled"""
+        policy = config.screenshot_policy
+        with self.lock:
+            self.logins += 1
+            sampled = policy == "sample" and self.logins % max(1, config.screenshot_sample_rate) == 0
+        return LoginCapture(
+            self, driver, username, config,
+            steps=policy == "always" or sampled,
+            failures=policy != "off"
+        )
+    
+    def submit(self, username: str, step: str, png: bytes, config: CrawlerConfig):
+        """Queue a screenshot for the writer thread, dropping it when the writer is behind"""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="screenshot-writer", daemon=True)
+                self.thread.start()
+        
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        name = f"{stamp}__{step}__{self.file_account(username)}.png"
+        try:
+            self.queue.put_nowait((config.screenshot_dir, config.screenshot_max_bytes, name, png))
+        except queue.Full:
+            logger.warning(f"Screenshot writer is behind, dropped {step} screenshot for {username}")
+    
+    @staticmethod
+    def file_account(username: str) -> str:
+        """Account name as it appears in screenshot file names"""
+        return re.sub(r'[^\w.-]', '_', username)
+    
+    def run(self):
+        """Writer thread loop"""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            directory, max_bytes, name, png = item
+            try:
+                self.write(directory, max_bytes, name, png)
+            except Exception as e:
+                logger.warning(f"Error writing screenshot {name}: {str(e)}")
+    
+    def load_index(self, directory: str):
+        """Index the screenshots already in a directory, oldest first"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.files = deque()
+        self.total_bytes = 0
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".png"):
+                size = os.path.getsize(os.path.join(directory, name))
+                self.files.append((name, size))
+                self.total_bytes += size
+    
+    def write(self, directory: str, max_bytes: int, name: str, png: bytes):
+        """Write one screenshot and delete the oldest ones beyond max_bytes"""
+        if directory != self.directory:
+            self.load_index(directory)
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(png)
+        self.files.append((name, len(png)))
+        self.total_bytes += len(png)
+        
+        # Always keep the newest screenshot, even when it alone exceeds the budget
+        while self.total_bytes > max_bytes and len(self.files) > 1:
+            old_name, old_size = self.files.popleft()
+            self.total_bytes -= old_size
+            try:
+                os.remove(os.path.join(directory, old_name))
+            except FileNotFoundError:
+                pass
+        logger.info(f"Saved screenshot {name}")
+    
+    @staticmethod
+    def list(directory: str) -> List[Dict[str, Any]]:
+        """Screenshots in a directory, newest first"""
+        if not os.path.isdir(directory):
+            return []
+        screenshots = []
+        for name in sorted(os.listdir(directory), reverse=True):
+            parts = name[:-len(".png")].split("__", 2)
+            if not name.endswith(".png") or len(parts) != 3:
+                continue
+            stamp, step, username = parts
+            try:
+                captured_at = datetime.strptime(stamp, "%Y%m%dT%H%M%S%f")
+            except ValueError:
+                continue
+            screenshots.append({
+                "name": name,
+                "account": username,
+                "step": step,
+                "size": os.path.getsize(os.path.join(directory, name)),
+                "captured_at": captured_at
+            })
+        return screenshots
+    
+    def stop(self):
+        """Let the writer finish the queued screenshots"""
+        if self.thread and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+
+screenshot_recorder = ScreenshotRecorder()
+
+# CDP Browser Backend
+# Finds the first element matched by a list of (name, by, value) strategies and keeps it for later actions
+CDP_LOCATE_SCRIPT = """
+(function (element, strategies, clickable) {
+    function find(by, value) {
+        if (by === 'xpath') {
+            var result = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var nodes = [];
+            for (var i = 0; i < result.snapshotLength; i++) {
+                nodes.push(result.snapshotItem(i));
+            }
+            return nodes;
+        }
+        if (by === 'name') {
+            return Array.prototype.slice.call(document.getElementsByName(value));
+        }
+        if (by === 'id') {
+            var node = document.getElementById(value);
+            return node ? [node] : [];
+        }
+        return Array.prototype.slice.call(document.querySelectorAll(value));
+    }
+    for (var s = 0; s < strategies.length; s++) {
+        var nodes = find(strategies[s][1], strategies[s][2]);
+        for (var n = 0; n < nodes.length; n++) {
+            if (clickable && (nodes[n].disabled || !nodes[n].getClientRects().length)) {
+                continue;
+            }
+            window.__crawlerElements = window.__crawlerElements || {};
+            window.__crawlerElements[element] = nodes[n];
+            return strategies[s][0];
+        }
+    }
+    return null;
+})
+"""
+
+# Same test as XiaoBaCrawler.is_session_expired, in one evaluation
+CDP_SESSION_EXPIRED_SCRIPT = """
+(function (targetUrl) {
+    if (document.querySelector("input[type='password']")) {
+        return true;
+    }
+    return location.href.replace(/\\/$/, '') === targetUrl.replace(/\\/$/, '') &&
+        !document.getElementsByTagName('table').length;
+})
+"""
+
+class CdpError(Exception):
+    """Error reply of the DevTools protocol, or a lost connection"""
+
+class CdpConnection:
+    """Async DevTools protocol client over one browser WebSocket, commands are matched to replies by id"""
+    
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.next_id = 0
+        self.pending: Dict[int, asyncio.Future] = {}
+        # Event handlers per page session id
+        self.listeners: Dict[str, Callable[[str, Dict[str, Any]], None]] = {}
+        self.reader = asyncio.create_task(self.read())
+    
+    @classmethod
+    async def connect(cls, url: str) -> "CdpConnection":
+        # Screenshots travel as base64 in a single message
+        websocket = await websockets.connect(url, max_size=64 * 1024 * 1024, ping_interval=None)
+        return cls(websocket)
+    
+    async def read(self):
+        """Resolve pending commands with their replies and hand events to their session's listener"""
+        try:
+            async for message in self.websocket:
+                reply = json.loads(message)
+                if "method" in reply:
+                    listener = self.listeners.get(reply.get("sessionId"))
+                    if listener:
+                        listener(reply["method"], reply.get("params", {}))
+                    continue
+                future = self.pending.pop(reply.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in reply:
+                    future.set_exception(CdpError(reply["error"].get("message", "CDP error")))
+                else:
+                    future.set_result(reply.get("result", {}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(CdpError("DevTools connection closed"))
+            self.pending.clear()
+    
+    @property
+    def closed(self) -> bool:
+        return self.reader.done()
+    
+    async def send(self, method: str, params: Optional[Dict[str, Any]] = None, session_id: Optional[str] = None,
+                   timeout: float = 30) -> Dict[str, Any]:
+        """Send a command, to the browser or to an attached page session, and wait for its reply"""
+        if self.closed:
+            raise CdpError("DevTools connection closed")
+        self.next_id += 1
+        command_id = self.next_id
+        message = {"id": command_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        
+        future = asyncio.get_running_loop().create_future()
+        self.pending[command_id] = future
+        try:
+            await self.websocket.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(command_id, None)
+    
+    async def close(self):
+        await self.websocket.close()
+        await asyncio.gather(self.reader, return_exceptions=True)
+
+class CdpBrowser:
+    """A Chromium process driven over its DevTools WebSocket, without chromedriver"""
+    
+    def __init__(self, process, connection: CdpConnection, user_data_dir: str):
+        self.process = process
+        self.connection = connection
+        self.user_data_dir = user_data_dir
+        self.pages: Dict[str, "CdpPage"] = {}
+        self.started_at = datetime.utcnow()
+        self.rss: Optional[int] = None
+        self.measured_at: Optional[datetime] = None
+        # Why the browser takes no new pages, it stops once its last page closed
+        self.retiring: Optional[str] = None
+    
+    @classmethod
+    async def launch(cls, config: CrawlerConfig) -> "CdpBrowser":
+        """Start Chromium on a free DevTools port and connect to it"""
+        user_data_dir = tempfile.mkdtemp(prefix="xiaoba-cdp-")
+        process = await asyncio.create_subprocess_exec(
+            CHROMIUM_BINARY, *chrome_arguments(config),
+            "--remote-debugging-port=0", f"--user-data-dir={user_data_dir}", "about:blank",
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+        
+        # Chromium writes the port it picked and the browser endpoint path to DevToolsActivePort
+        port_file = os.path.join(user_data_dir, "DevToolsActivePort")
+        deadline = time.monotonic() + 20
+        endpoint = None
+        while endpoint is None:
+            if os.path.exists(port_file):
+                with open(port_file) as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    endpoint = f"ws://127.0.0.1:{lines[0]}{lines[1]}"
+                    break
+            if process.returncode is not None or time.monotonic() > deadline:
+                if process.returncode is None:
+                    process.kill()
+                shutil.rmtree(user_data_dir, ignore_errors=True)
+                raise CdpError("Chromium did not open its DevTools port")
+            await asyncio.sleep(0.05)
+        
+        connection = await CdpConnection.connect(endpoint)
+        logger.info(f"Launched Chromium {process.pid} for the CDP backend")
+        return cls(process, connection, user_data_dir)
+    
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None and not self.connection.closed
+    
+    async def close(self):
+        """Disconnect, stop the process and remove its profile"""
+        try:
+            await self.connection.close()
+        except Exception as e:
+            logger.warning(f"Error closing DevTools connection: {str(e)}")
+        if self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+        shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+class CdpPage:
+    """One account's tab in its own browser context, driven through an attached CDP session"""
+    
+    def __init__(self, browser: CdpBrowser, context_id: str, target_id: str, session_id: str):
+        self.browser = browser
+        self.context_id = context_id
+        self.target_id = target_id
+        self.session_id = session_id
+        # (url, request id) of the XHR and fetch responses since they were last taken
+        self.responses: deque = deque(maxlen=200)
+    
+    async def send(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30):
+        return await self.browser.connection.send(method, params, self.session_id, timeout)
+    
+    async def evaluate(self, expression: str, timeout: float = 30):
+        """Evaluate JavaScript in the page and return its JSON value"""
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression, "returnByValue": True, "awaitPromise": True
+        }, timeout)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise CdpError(details.get("exception", {}).get("description") or details.get("text", "Evaluation failed"))
+        return result.get("result", {}).get("value")
+    
+    async def call(self, function: str, *args, timeout: float = 30):
+        """Call a JavaScript function expression with JSON arguments"""
+        arguments = ", ".join(json.dumps(arg, ensure_ascii=False) for arg in args)
+        return await self.evaluate(f"({function})({arguments})", timeout)
+    
+    async def wait_for(self, check, timeout: float, interval: float = 0.1):
+        """Poll an async check until it returns a truthy value, like WebDriverWait.until"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                value = await check()
+                if value:
+                    return value
+            except CdpError:
+                # The page is navigating, its execution context is being replaced
+                pass
+            if time.monotonic() >= deadline:
+                raise asyncio.TimeoutError()
+            await asyncio.sleep(interval)
+    
+    async def goto(self, url: str, timeout: float = 30):
+        """Navigate and wait until the new document has loaded"""
+        result = await self.send("Page.navigate", {"url": url}, timeout)
+        if result.get("errorText"):
+            raise CdpError(f"Navigation to {url} failed: {result['errorText']}")
+        await self.wait_for(lambda: self.evaluate("document.readyState === 'complete'"), timeout)
+    
+    async def url(self) -> str:
+        return await self.evaluate("location.href")
+    
+    async def screenshot(self) -> bytes:
+        result = await self.send("Page.captureScreenshot", {"format": "png"})
+        return base64.b64decode(result["data"])
+    
+    async def get_cookies(self) -> List[Dict[str, Any]]:
+        """Cookies of this page's browser context, in the Selenium cookie format of the session store"""
+        result = await self.browser.connection.send("Storage.getCookies", {"browserContextId": self.context_id})
+        cookies = []
+        for cookie in result.get("cookies", []):
+            item = {
+                "name": cookie["name"],
+                "value": cookie["value"],
+                "domain": cookie.get("domain"),
+                "path": cookie.get("path", "/"),
+                "secure": cookie.get("secure", False),
+                "httpOnly": cookie.get("httpOnly", False)
+            }
+            if not cookie.get("session") and cookie.get("expires", -1) > 0:
+                item["expiry"] = int(cookie["expires"])
+            cookies.append(item)
+        return cookies
+    
+    async def set_cookies(self, cookies: List[Dict[str, Any]], url: str):
+        """Load session store cookies into this page's browser context"""
+        params = []
+        for cookie in cookies:
+            param = {"name": cookie["name"], "value": cookie["value"], "path": cookie.get("path") or "/"}
+            if cookie.get("domain"):
+                param["domain"] = cookie["domain"]
+            else:
+                param["url"] = url
+            if cookie.get("secure"):
+                param["secure"] = True
+            if cookie.get("httpOnly"):
+                param["httpOnly"] = True
+            if cookie.get("expiry"):
+                param["expires"] = cookie["expiry"]
+            params.append(param)
+        await self.browser.connection.send("Storage.setCookies", {"cookies": params, "browserContextId": self.context_id})
+    
+    async def capture_network(self):
+        """Record the page's XHR and fetch responses so the table can be read from its JSON"""
+        def on_event(method: str, params: Dict[str, Any]):
+            if method == "Network.responseReceived" and is_data_response(params):
+                self.responses.append((params["response"]["url"], params["requestId"]))
+        
+        self.browser.connection.listeners[self.session_id] = on_event
+        await self.send("Network.enable")
+    
+    def take_responses(self) -> List[tuple]:
+        responses = list(self.responses)
+        self.responses.clear()
+        return responses
+    
+    async def response_json(self, request_id: str):
+        """JSON body of a captured response, None when it is gone or not JSON"""
+        try:
+            return parse_response_body(await self.send("Network.getResponseBody", {"requestId": request_id}))
+        except CdpError:
+            return None
+    
+    async def apply_resource_policy(self, config: CrawlerConfig):
+        """Block the configured resource types for this page"""
+        block_params = blocked_url_params(config)
+        if not block_params:
+            return
+        params, fallback = block_params
+        await self.send("Network.enable")
+        try:
+            await self.send("Network.setBlockedURLs", params)
+        except CdpError:
+            await self.send("Network.setBlockedURLs", fallback)
+
+class CdpBrowserPool:
+    """Spreads CDP sessions over a few Chromium processes, one isolated browser context per account"""
+    
+    def __init__(self):
+        self.browsers: List[CdpBrowser] = []
+        self.lock: Optional[asyncio.Lock] = None
+    
+    def refresh(self, browser: CdpBrowser, config: CrawlerConfig) -> Optional[str]:
+        """Measure a browser now and then and mark it retiring once it crossed a shared browser limit"""
+        if browser.retiring:
+            return browser.retiring
+        now = datetime.utcnow()
+        if browser.measured_at is None or (now - browser.measured_at).total_seconds() >= BrowserContextPool.MEASURE_INTERVAL:
+            browser.rss = process_tree_rss(browser.process.pid)
+            browser.measured_at = now
+        reason = BrowserContextPool.retire_reason(browser, config)
+        if reason:
+            browser.retiring = reason
+            logger.info(f"Retiring CDP browser {browser.process.pid} with {len(browser.pages)} pages: {reason}")
+        return reason
+    
+    async def open_page(self, config: CrawlerConfig) -> CdpPage:
+        """Create an isolated browser context with one attached tab"""
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            for browser in [browser for browser in self.browsers if not browser.alive]:
+                logger.warning(f"Dropping dead CDP browser with {len(browser.pages)} pages")
+                self.browsers.remove(browser)
+                await browser.close()
+            loop = asyncio.get_running_loop()
+            candidates = [
+                browser for browser in self.browsers
+                if len(browser.pages) < max(1, config.accounts_per_browser)
+                and not await loop.run_in_executor(None, self.refresh, browser, config)
+            ]
+            if candidates:
+                browser = min(candidates, key=lambda browser: len(browser.pages))
+            else:
+                browser = await CdpBrowser.launch(config)
+                self.browsers.append(browser)
+            
+            connection = browser.connection
+            context_id = (await connection.send("Target.createBrowserContext", {"disposeOnDetach": True}))["browserContextId"]
+            target_id = (await connection.send(
+                "Target.createTarget", {"url": "about:blank", "browserContextId": context_id}
+            ))["targetId"]
+            session_id = (await connection.send(
+                "Target.attachToTarget", {"targetId": target_id, "flatten": True}
+            ))["sessionId"]
+            page = CdpPage(browser, context_id, target_id, session_id)
+            browser.pages[target_id] = page
+        
+        await page.send("Page.enable")
+        await page.send("Page.addScriptToEvaluateOnNewDocument", {
+            "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+        })
+        try:
+            await page.apply_resource_policy(config)
+        except CdpError as e:
+            logger.warning(f"Could not apply resource blocking to CDP page: {str(e)}")
+        if config.network_capture:
+            await page.capture_network()
+        return page
+    
+    async def close_page(self, page: CdpPage):
+        """Dispose a page's browser context, stopping its Chromium when no pages are left"""
+        browser = page.browser
+        browser.pages.pop(page.target_id, None)
+        browser.connection.listeners.pop(page.session_id, None)
+        try:
+            await browser.connection.send("Target.disposeBrowserContext", {"browserContextId": page.context_id}, timeout=10)
+        except (CdpError, asyncio.TimeoutError) as e:
+            logger.warning(f"Error disposing CDP browser context: {str(e)}")
+        
+        if not browser.pages and browser in self.browsers:
+            self.browsers.remove(browser)
+            await browser.close()
+    
+    async def close_all(self):
+        browsers = list(self.browsers)
+        self.browsers.clear()
+        await asyncio.gather(*(browser.close() for browser in browsers), return_exceptions=True)
+    
+    def usage(self) -> List[Dict[str, Any]]:
+        """CDP browsers with their page count and process-tree memory"""
+        browsers = []
+        for browser in list(self.browsers):
+            rss = process_tree_rss(browser.process.pid)
+            browsers.append({
+                "pid": browser.process.pid,
+                "pages": len(browser.pages),
+                "age_seconds": round((datetime.utcnow() - browser.started_at).total_seconds()),
+                "rss_mb": round(rss / (1024 * 1024), 1) if rss else None,
+                "retiring": browser.retiring
+            })
+        return browsers
+
+cdp_browsers = CdpBrowserPool()
+
+class CdpBrowserSession:
+    """The browser side of XiaoBaCrawler (setup_driver, login, parse_table_data) on the async CDP backend"""
+    
+    def __init__(self, account: CrawlerAccount, config: CrawlerConfig):
+        self.account = account
+        self.config = config
+        self.page: Optional[CdpPage] = None
+        self.logged_in = False
+        self.data_url: Optional[str] = None
+        self.pages = 0
+        self.last_login_timings: Dict[str, float] = {}
+        self.session_saved = True
+    
+    async def setup_driver(self):
+        """Open the account's tab in a browser context of its own"""
+        self.page = await cdp_browsers.open_page(self.config)
+        self.logged_in = False
+        self.pages = 0
+    
+    async def goto(self, url: str):
+        self.pages += 1
+        await self.page.goto(url, self.config.timeout)
+    
+    async def find_login_element(self, budget: LoginBudget, element: str, strategies, clickable: bool = False,
+                                 cap: Optional[float] = None) -> bool:
+        """Wait for a login element with the learned strategy first, like XiaoBaCrawler.find_login_element"""
+        target_url = self.config.target_url
+        ordered = [
+            [name, by, value] for name, (by, value) in selector_strategies.ordered(target_url, element, strategies)
+        ]
+        try:
+            strategy = await self.page.wait_for(
+                lambda: self.page.call(CDP_LOCATE_SCRIPT, element, ordered, clickable), budget.remaining(cap)
+            )
+        except asyncio.TimeoutError:
+            selector_strategies.forget(target_url, element)
+            return False
+        
+        logger.info(f"Found {element} using {strategy}")
+        selector_strategies.record(target_url, element, strategy)
+        return True
+    
+    async def click(self, element: str):
+        await self.page.evaluate(
+            f"(function (e) {{ e.scrollIntoView(true); e.click(); }})(window.__crawlerElements[{json.dumps(element)}])"
+        )
+    
+    async def fill(self, element: str, value: str):
+        """Type a value into a located input, firing the events a user's typing would"""
+        await self.page.evaluate(
+            f"(function (e, value) {{ e.focus(); e.value = value;"
+            f" e.dispatchEvent(new Event('input', {{bubbles: true}}));"
+            f" e.dispatchEvent(new Event('change', {{bubbles: true}})); }})"
+            f"(window.__crawlerElements[{json.dumps(element)}], {json.dumps(value, ensure_ascii=False)})"
+        )
+    
+    async def capture(self, capture: LoginCapture, step: str, failure: bool = False):
+        """Take a login screenshot if the screenshot policy wants it"""
+        if not capture.wants(failure):
+            return
+        try:
+            png = await self.page.screenshot()
+        except (CdpError, asyncio.TimeoutError) as e:
+            logger.warning(f"Error capturing {step} screenshot for {self.account.username}: {str(e)}")
+            return
+        capture.recorder.submit(self.account.username, step, png, self.config)
+    
+    async def login(self) -> bool:
+        """Login with 师门 button selection, the same steps and strategies as XiaoBaCrawler.login"""
+        budget = LoginBudget(self.config.login_timeout)
+        self.last_login_timings = budget.timings
+        capture = screenshot_recorder.for_login(None, self.account.username, self.config)
+        try:
+            await self.goto(self.config.target_url)
+            budget.mark("page_load")
+            await self.capture(capture, "login_page")
+            
+            logger.info(f"Looking for 师门 button for account: {self.account.username}")
+            if await self.find_login_element(budget, "shimen_button", SHIMEN_BUTTON_STRATEGIES, clickable=True, cap=10):
+                budget.mark("shimen_button")
+                await self.click("shimen_button")
+                logger.info("Clicked 师门 button successfully")
+                await self.capture(capture, "after_shimen")
+            else:
+                budget.mark("shimen_button")
+                logger.error("Could not find 师门 button! This might cause login to fail.")
+                await self.capture(capture, "no_shimen_button", failure=True)
+            
+            found = await self.find_login_element(budget, "username_field", USERNAME_FIELD_STRATEGIES)
+            if found:
+                found = await self.find_login_element(budget, "password_field", PASSWORD_FIELD_STRATEGIES)
+            budget.mark("login_form")
+            if not found:
+                logger.error("Could not find login form fields after clicking 师门 button")
+                await self.capture(capture, "no_login_form", failure=True)
+                return False
+            
+            await self.fill("username_field", self.account.username)
+            await self.fill("password_field", self.account.password)
+            budget.mark("fill")
+            await self.capture(capture, "before_login")
+            
+            if not await self.find_login_element(budget, "submit_button", SUBMIT_BUTTON_STRATEGIES, clickable=True, cap=0):
+                budget.mark("submit")
+                logger.error("Could not find login button!")
+                await self.capture(capture, "no_login_button", failure=True)
+                return False
+            await self.click("submit_button")
+            budget.mark("submit")
+            
+            # Logged in once the page left the login form
+            target_url = self.config.target_url
+            await self.page.wait_for(
+                lambda: self.page.evaluate(
+                    f"location.href !== {json.dumps(target_url)} || !document.getElementsByName('username').length"
+                ),
+                budget.remaining(10)
+            )
+            budget.mark("confirm")
+            self.pages += 1
+            
+            logger.info(f"Successfully logged in with account: {self.account.username}")
+            return True
+            
+        except asyncio.TimeoutError:
+            logger.error(f"Login timeout for account: {self.account.username}")
+            await self.capture(capture, "login_timeout", failure=True)
+            return False
+        except CdpError as e:
+            logger.error(f"Login error for account {self.account.username}: {str(e)}")
+            await self.capture(capture, "login_error", failure=True)
+            return False
+        finally:
+            logger.info(f"Login timings for {self.account.username}: {budget.timings} (total {budget.elapsed()}s)")
+    
+    async def is_session_expired(self) -> bool:
+        return await self.page.call(CDP_SESSION_EXPIRED_SCRIPT, self.config.target_url)
+    
+    async def restore_cookies(self, saved: Dict[str, Any]) -> bool:
+        """Load saved session cookies into the fresh browser context"""
+        data_url = saved.get("data_url")
+        if not data_url or not saved.get("cookies"):
+            return False
+        try:
+            await self.page.set_cookies(saved["cookies"], data_url)
+        except CdpError as e:
+            logger.warning(f"Could not restore session cookies for {self.account.username}: {str(e)}")
+            return False
+        self.logged_in = True
+        self.data_url = data_url
+        logger.info(f"Restored {len(saved['cookies'])} saved session cookies for account: {self.account.username}")
+        return True
+    
+    async def ensure_session(self) -> bool:
+        """Reload the data page of a live session, logging in again only when it has expired"""
+        if self.logged_in and self.data_url:
+            try:
+                await self.goto(self.data_url)
+                if not await self.is_session_expired():
+                    logger.info(f"Reusing logged-in session for account: {self.account.username}")
+                    return True
+                logger.info(f"Session expired for account {self.account.username}, logging in again")
+            except (CdpError, asyncio.TimeoutError):
+                logger.warning(f"Timeout reloading data page for {self.account.username}, logging in again")
+            self.logged_in = False
+        
+        if not await self.login():
+            return False
+        self.logged_in = True
+        self.data_url = await self.page.url()
+        self.session_saved = False
+        return True
+    
+    async def get_cookies(self) -> List[Dict[str, Any]]:
+        return await self.page.get_cookies()
+    
+    async def parse_table_data(self) -> List[List[str]]:
+        """Read the table rows (cell texts, header first) from its JSON response or the in-browser extraction script"""
+        responses = []
+        if self.config.network_capture:
+            responses = self.page.take_responses()
+            rows = await self.read_network_table(responses)
+            if rows:
+                return rows
+        
+        try:
+            await self.page.wait_for(lambda: self.page.evaluate("document.getElementsByTagName('table').length > 0"), 10)
+        except asyncio.TimeoutError:
+            logger.error("Timeout waiting for table to load")
+            return []
+        rows = await self.page.evaluate(f"(function () {{ {TABLE_EXTRACT_SCRIPT} }})()")
+        if rows is None:
+            logger.warning("No table found on the page")
+            return []
+        if responses and self.config.target_url not in network_table_sources:
+            await self.learn_network_table(responses, rows)
+        return rows
+    
+    async def read_network_table(self, responses: List[tuple]) -> Optional[List[List[str]]]:
+        """Decode the table from its learned JSON response, waiting briefly for the XHR to arrive"""
+        source = network_table_sources.get(self.config.target_url)
+        if not source:
+            return None
+        
+        deadline = time.monotonic() + 10
+        while True:
+            for url, request_id in reversed(responses):
+                if url.split("?")[0] != source["url"]:
+                    continue
+                payload = await self.page.response_json(request_id)
+                rows = decode_table_rows(payload, source) if payload is not None else None
+                if rows:
+                    logger.info(f"Read {len(rows) - 1} rows from the table's JSON response for {self.account.username}")
+                    return rows
+                logger.info(f"Table JSON response of {source['url']} no longer matches, falling back to the DOM")
+                network_table_sources.pop(self.config.target_url, None)
+                return None
+            if time.monotonic() >= deadline:
+                logger.info(f"No table JSON response seen for {self.account.username}, falling back to the DOM")
+                return None
+            await asyncio.sleep(0.1)
+            responses = responses + self.page.take_responses()
+    
+    async def learn_network_table(self, responses: List[tuple], dom_rows: List[List[str]]):
+        """Look for the captured JSON response that holds the rows just read from the DOM"""
+        for url, request_id in responses:
+            payload = await self.page.response_json(request_id)
+            source = learn_table_source(url, payload, dom_rows) if payload is not None else None
+            if source:
+                network_table_sources[self.config.target_url] = source
+                logger.info(f"Table data found in JSON response {source['url']}, reading it from the network from now on")
+                return
+    
+    async def close(self):
+        if self.page:
+            page, self.page = self.page, None
+            await cdp_browsers.close_page(page)
+        self.logged_in = False
+
 # Crawler Engine Class
 class XiaoBaCrawler:
     def __init__(self, account: CrawlerAccount, config: CrawlerConfig):
@@ -127,46 +2894,77 @@ class XiaoBaCrawler:
         self.config = config
         self.driver = None
         self.is_running = False
-        self.last_data = {}
+        # Logged-in session state, kept alive across crawl cycles
+        self.logged_in = False
+        self.data_url: Optional[str] = None
+        self.session_saved = True
+        self.last_login_timings: Dict[str, float] = {}
+        # Fingerprints of the last saved table and rows, unchanged content skips writes
+        self.table_fingerprint: Optional[str] = None
+        self.row_fingerprints: Dict[str, str] = {}
+        self.http_session = XiaoBaHttpSession(account, config)
+        # Browser usage tracked by the memory governor
+        self.driver_started_at: Optional[datetime] = None
+        self.driver_pages = 0
+        self.driver_rss: Optional[int] = None
+        self.recycle_count = 0
+        self.last_recycle_reason: Optional[str] = None
+        # Set in browser_contexts mode, the driver is then shared with other accounts
+        self.context: Optional[BrowserContext] = None
+        # Set when the cdp browser backend drives this account instead of Selenium
+        self.cdp: Optional[CdpBrowserSession] = None
+    
+    @property
+    def browser_open(self) -> bool:
+        return self.driver is not None or self.cdp is not None
+    
+    def update_account(self, account: CrawlerAccount, config: CrawlerConfig):
+        """Refresh account and config of a live session"""
+        if self.account.password != account.password:
+            # Credentials changed, the next cycle has to log in again
+            self.logged_in = False
+            self.http_session.logged_in = False
+        self.account = self.http_session.account = account
+        self.config = self.http_session.config = config
         
     def setup_driver(self):
-        """Setup Chrome driver with options"""
-        chrome_options = Options()
-        if self.config.headless:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # Use system Chromium
-        chrome_options.binary_location = "/usr/bin/chromium"
+        """Take a ready driver from the warm pool, starting Chrome only when the pool is empty"""
+        if self.config.browser_contexts:
+            # Share a Chromium with other accounts, isolated in a browser context of our own
+            self.context = browser_contexts.open(self.config)
+            self.driver = self.context.host.driver
+            self.driver_started_at = datetime.utcnow()
+            self.driver_pages = 0
+            self.driver_rss = None
+            return
         
-        try:
-            # Use system ChromeDriver directly without webdriver_manager
-            service = Service("/usr/bin/chromedriver")
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            logger.info("Chrome driver setup successful using system Chromium and ChromeDriver")
-        except Exception as e:
-            logger.error(f"Error setting up Chrome driver: {str(e)}")
-            raise e
-            
-        self.driver.set_page_load_timeout(self.config.timeout)
-        # Execute script to remove webdriver property
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        checked_out = warm_driver_pool.checkout(self.config)
+        if checked_out:
+            self.driver, self.driver_started_at = checked_out
+        else:
+            self.driver = create_chrome_driver(self.config)
+            self.driver_started_at = datetime.utcnow()
+        # Replace the driver that was just taken
+        warm_driver_pool.top_up(self.config)
+        
+        self.driver_pages = 0
+        self.driver_rss = None
         
     def login(self):
         """Login to the website with 师门 button selection"""
+        budget = LoginBudget(self.config.login_timeout)
+        self.last_login_timings = budget.timings
+        capture = screenshot_recorder.for_login(self.driver, self.account.username, self.config)
+        self.driver_pages += 1
         try:
             # Import the enhanced login method
             try:
                 from enhanced_login import enhance_login_method
                 logger.info("Using enhanced login method")
-                return enhance_login_method(self.driver, self.account, self.config, logger)
+                return enhance_login_method(
+                    self.driver, self.account, self.config, logger, budget, selector_strategies, probe_elements,
+                    capture
+                )
             except ImportError:
                 logger.warning("Enhanced login module not found, using default login method")
                 
@@ -174,71 +2972,27 @@ class XiaoBaCrawler:
             self.driver.get(self.config.target_url)
             
             # Wait for login page to load
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # Take a screenshot for debugging
-            try:
-                self.driver.save_screenshot(f"/app/debug_screenshots/login_page_{self.account.username}.png")
-                logger.info(f"Saved login page screenshot for {self.account.username}")
-            except:
-                pass
+            budget.wait(self.driver, page_ready, cap=15)
+            budget.mark("page_load")
             
-            # Wait a moment for page to fully load
-            time.sleep(2)
+            capture("login_page")
             
             # First, click the "师门" button as required
             logger.info(f"Looking for 师门 button for account: {self.account.username}")
             师门_button = None
             
-            # Enhanced strategies to find the 师门 button
-            try:
-                # Strategy 1: Look for button with exact text "师门"
-                师门_button = WebDriverWait(self.driver, 8).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[normalize-space(text())='师门']"))
-                )
-                logger.info("Found 师门 button using exact text match")
-            except:
-                try:
-                    # Strategy 2: Look for input type button with value "师门"
-                    师门_button = WebDriverWait(self.driver, 5).until(
-                        EC.element_to_be_clickable((By.XPATH, "//input[@type='button' and @value='师门']"))
-                    )
-                    logger.info("Found 师门 button using input button")
-                except:
-                    try:
-                        # Strategy 3: Look for any clickable element containing "师门"
-                        师门_button = WebDriverWait(self.driver, 5).until(
-                            EC.element_to_be_clickable((By.XPATH, "//*[contains(text(), '师门') and (name()='button' or name()='input' or name()='a' or name()='div')]"))
-                        )
-                        logger.info("Found 师门 button using general element search")
-                    except:
-                        try:
-                            # Strategy 4: Look by class or other attributes that might indicate login type selection
-                            buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                            inputs = self.driver.find_elements(By.TAG_NAME, "input")
-                            all_elements = buttons + inputs
-                            
-                            for element in all_elements:
-                                element_text = element.text.strip() if element.text else ""
-                                element_value = element.get_attribute('value') or ""
-                                
-                                if "师门" in element_text or "师门" in element_value:
-                                    师门_button = element
-                                    logger.info(f"Found 师门 button using comprehensive search: {element.tag_name}")
-                                    break
-                        except Exception as e:
-                            logger.warning(f"Error in comprehensive button search: {str(e)}")
+            # One wait polls every strategy, the one learned for this page first
+            师门_button = self.find_login_element(budget, "shimen_button", SHIMEN_BUTTON_STRATEGIES, clickable=True, cap=10)
+            budget.mark("shimen_button")
             
             if 师门_button:
                 try:
                     # Scroll to the button to ensure it's visible
                     self.driver.execute_script("arguments[0].scrollIntoView(true);", 师门_button)
-                    time.sleep(0.5)
                     
                     # Highlight the button for debugging
-                    self.driver.execute_script("arguments[0].style.border='3px solid red';", 师门_button)
+                    if capture.steps:
+                        self.driver.execute_script("arguments[0].style.border='3px solid red';", 师门_button)
                     
                     # Try regular click first
                     师门_button.click()
@@ -252,100 +3006,25 @@ class XiaoBaCrawler:
                     except Exception as js_error:
                         logger.error(f"Failed to click 师门 button: regular={click_error}, js={js_error}")
                 
-                # Wait for the form to update after selecting 师门
-                time.sleep(2)
-                
-                # Take another screenshot after clicking 师门
-                try:
-                    self.driver.save_screenshot(f"/app/debug_screenshots/after_shimen_{self.account.username}.png")
-                    logger.info(f"Saved post-师门 screenshot for {self.account.username}")
-                except:
-                    pass
+                capture("after_shimen")
                     
             else:
                 logger.error("Could not find 师门 button! This might cause login to fail.")
-                # Take screenshot of the current page for debugging
-                try:
-                    self.driver.save_screenshot(f"/app/debug_screenshots/no_shimen_button_{self.account.username}.png")
-                    logger.info(f"Saved no-师门-button screenshot for debugging")
-                except:
-                    pass
+                capture("no_shimen_button", failure=True)
             
             # Wait for login form to be available after selecting 师门
             logger.info("Waiting for login form to appear after clicking 师门...")
             
-            # Try multiple strategies to find the username field after clicking 师门
-            username_field = None
+            # Wait until both fields exist instead of retrying with fixed sleeps
+            username_field = self.find_login_element(budget, "username_field", USERNAME_FIELD_STRATEGIES)
             password_field = None
-            
-            # Wait longer and try different selectors
-            for attempt in range(3):
-                try:
-                    logger.info(f"Attempt {attempt + 1} to find login form...")
-                    
-                    # Try different selectors for username field
-                    for selector in ['username', 'user', 'account', 'name']:
-                        try:
-                            username_field = WebDriverWait(self.driver, 10).until(
-                                EC.presence_of_element_located((By.NAME, selector))
-                            )
-                            logger.info(f"Found username field using name='{selector}'")
-                            break
-                        except:
-                            continue
-                    
-                    if not username_field:
-                        # Try by ID
-                        for selector in ['username', 'user', 'account', 'name']:
-                            try:
-                                username_field = self.driver.find_element(By.ID, selector)
-                                logger.info(f"Found username field using id='{selector}'")
-                                break
-                            except:
-                                continue
-                    
-                    if not username_field:
-                        # Try by type
-                        try:
-                            username_field = self.driver.find_element(By.XPATH, "//input[@type='text' or @type='email']")
-                            logger.info("Found username field using input type")
-                        except:
-                            pass
-                    
-                    if username_field:
-                        # Look for password field near the username field
-                        try:
-                            password_field = self.driver.find_element(By.NAME, "password")
-                            logger.info("Found password field using name='password'")
-                        except:
-                            try:
-                                password_field = self.driver.find_element(By.ID, "password")
-                                logger.info("Found password field using id='password'")
-                            except:
-                                try:
-                                    password_field = self.driver.find_element(By.XPATH, "//input[@type='password']")
-                                    logger.info("Found password field using type='password'")
-                                except:
-                                    pass
-                        
-                        if password_field:
-                            break
-                    
-                    # If we didn't find the fields, wait and try again
-                    logger.info(f"Login form not ready yet, waiting 5 seconds before next attempt...")
-                    time.sleep(5)
-                    
-                except Exception as e:
-                    logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
-                    time.sleep(5)
+            if username_field:
+                password_field = self.find_login_element(budget, "password_field", PASSWORD_FIELD_STRATEGIES)
+            budget.mark("login_form")
             
             if not username_field or not password_field:
                 logger.error("Could not find login form fields after clicking 师门 button")
-                try:
-                    self.driver.save_screenshot(f"/app/debug_screenshots/no_login_form_{self.account.username}.png")
-                    logger.info(f"Saved no-login-form screenshot for debugging")
-                except:
-                    pass
+                capture("no_login_form", failure=True)
                 return False
             
             # Fill in username and password
@@ -360,131 +3039,151 @@ class XiaoBaCrawler:
             except Exception as e:
                 logger.error(f"Error filling login form: {str(e)}")
                 return False
+            budget.mark("fill")
             
-            # Take screenshot before clicking login
-            try:
-                self.driver.save_screenshot(f"/app/debug_screenshots/before_login_{self.account.username}.png")
-                logger.info(f"Saved before-login screenshot for {self.account.username}")
-            except:
-                pass
+            capture("before_login")
             
-            # Find and click login button - try multiple strategies
+            # Find and click login button, the form is already present so no wait is needed
             login_clicked = False
-            try:
-                # Strategy 1: Look for submit button
-                login_button = self.driver.find_element(By.CSS_SELECTOR, "button[type='submit'], input[type='submit']")
-                login_button.click()
-                login_clicked = True
-                logger.info("Clicked login button using submit selector")
-            except:
+            login_button = self.find_login_element(budget, "submit_button", SUBMIT_BUTTON_STRATEGIES, clickable=True, cap=0)
+            if login_button:
                 try:
-                    # Strategy 2: Look for button with login-related text
-                    login_button = self.driver.find_element(By.XPATH, "//button[contains(text(), '登录') or contains(text(), '登錄') or contains(text(), 'Login')]")
                     login_button.click()
-                    login_clicked = True
-                    logger.info("Clicked login button using text search")
-                except:
-                    try:
-                        # Strategy 3: Look for input with login-related value
-                        login_button = self.driver.find_element(By.XPATH, "//input[@value='登录' or @value='登錄' or @value='Login']")
-                        login_button.click()
-                        login_clicked = True
-                        logger.info("Clicked login button using input value")
-                    except:
-                        # Strategy 4: Find all buttons and look for login-related ones
-                        buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                        inputs = self.driver.find_elements(By.XPATH, "//input[@type='button' or @type='submit']")
-                        
-                        for element in buttons + inputs:
-                            text = element.text.strip() if element.text else ""
-                            value = element.get_attribute('value') or ""
-                            
-                            if any(keyword in text.lower() or keyword in value.lower() for keyword in ['登录', '登錄', 'login', '确定', '提交']):
-                                element.click()
-                                login_clicked = True
-                                logger.info(f"Clicked login button using comprehensive search: {text or value}")
-                                break
+                except Exception:
+                    self.driver.execute_script("arguments[0].click();", login_button)
+                login_clicked = True
+                logger.info("Clicked login button")
+            budget.mark("submit")
             
             if not login_clicked:
                 logger.error("Could not find login button!")
-                try:
-                    self.driver.save_screenshot(f"/app/debug_screenshots/no_login_button_{self.account.username}.png")
-                except:
-                    pass
+                capture("no_login_button", failure=True)
                 return False
             
             # Wait for successful login - check if we're redirected or if login form disappears
-            WebDriverWait(self.driver, 10).until(
-                lambda driver: driver.current_url != self.config.target_url or 
-                len(driver.find_elements(By.NAME, "username")) == 0
-            )
+            budget.wait(self.driver, login_confirmed(self.config.target_url), cap=10)
+            budget.mark("confirm")
             
             logger.info(f"Successfully logged in with account: {self.account.username}")
             return True
             
         except TimeoutException:
             logger.error(f"Login timeout for account: {self.account.username}")
+            capture("login_timeout", failure=True)
             return False
         except Exception as e:
             logger.error(f"Login error for account {self.account.username}: {str(e)}")
+            capture("login_error", failure=True)
             return False
+        finally:
+            logger.info(f"Login timings for {self.account.username}: {budget.timings} (total {budget.elapsed()}s)")
     
-    def parse_table_data(self):
-        """Parse the table data from the current page"""
+    def find_login_element(self, budget: LoginBudget, element: str, strategies, clickable: bool = False,
+                           cap: Optional[float] = None):
+        """Find a login element with the learned strategy first, recording which strategy matched"""
+        target_url = self.config.target_url
         try:
+            strategy, found = budget.wait(
+                self.driver,
+                first_match(selector_strategies.ordered(target_url, element, strategies), clickable=clickable),
+                cap=cap
+            )
+        except TimeoutException:
+            selector_strategies.forget(target_url, element)
+            return None
+        
+        logger.info(f"Found {element} using {strategy}")
+        selector_strategies.record(target_url, element, strategy)
+        return found
+    
+    def is_session_expired(self) -> bool:
+        """Check whether the current page is the login form instead of the data page"""
+        if self.driver.find_elements(By.XPATH, "//input[@type='password']"):
+            return True
+        return self.driver.current_url.rstrip('/') == self.config.target_url.rstrip('/') and \
+            not self.driver.find_elements(By.TAG_NAME, "table")
+    
+    def restore_cookies(self, saved: Dict[str, Any]) -> bool:
+        """Load saved session cookies into a fresh driver"""
+        data_url = saved.get("data_url")
+        if not data_url:
+            return False
+        
+        # Cookies can only be set for the domain of the current page
+        try:
+            self.driver.get(urljoin(data_url, "/"))
+        except WebDriverException as e:
+            logger.warning(f"Could not open {data_url} to restore session for {self.account.username}: {str(e)}")
+            return False
+        restored = 0
+        for cookie in saved["cookies"]:
+            cookie = {key: value for key, value in cookie.items() if value is not None}
+            try:
+                self.driver.add_cookie(cookie)
+                restored += 1
+            except WebDriverException as e:
+                logger.warning(f"Could not restore cookie {cookie.get('name')} for {self.account.username}: {str(e)}")
+        
+        if not restored:
+            return False
+        self.logged_in = True
+        self.data_url = data_url
+        logger.info(f"Restored {restored} saved session cookies for account: {self.account.username}")
+        return True
+    
+    def ensure_session(self) -> bool:
+        """Reload the data page of a live session, logging in again only when it has expired"""
+        if self.logged_in and self.data_url:
+            try:
+                self.driver_pages += 1
+                self.driver.get(self.data_url)
+                if not self.is_session_expired():
+                    logger.info(f"Reusing logged-in session for account: {self.account.username}")
+                    return True
+                logger.info(f"Session expired for account {self.account.username}, logging in again")
+            except TimeoutException:
+                logger.warning(f"Timeout reloading data page for {self.account.username}, logging in again")
+            self.logged_in = False
+        
+        if not self.login():
+            return False
+        
+        self.logged_in = True
+        self.data_url = self.driver.current_url
+        self.session_saved = False
+        return True
+    
+    def parse_table_data(self) -> Iterable[List[str]]:
+        """Read the table rows (cell texts, header first) from the current page"""
+        try:
+            responses = []
+            if self.config.network_capture:
+                responses = self.captured_responses()
+                rows = self.read_network_table(responses)
+                if rows:
+                    return rows
+            
             # Wait for table to load
             WebDriverWait(self.driver, 10).until(
                 EC.presence_of_element_located((By.TAG_NAME, "table"))
             )
             
-            # Get table HTML
-            table_html = self.driver.page_source
-            soup = BeautifulSoup(table_html, 'html.parser')
-            
-            # Find the data table
-            tables = soup.find_all('table')
-            if not tables:
-                logger.warning("No table found on the page")
-                return []
+            if self.config.table_extraction == "script":
+                # Serialize only the table's cell texts in the browser
+                rows = self.driver.execute_script(TABLE_EXTRACT_SCRIPT)
+                if rows is None:
+                    logger.warning("No table found on the page")
+                    return []
+                if responses and self.config.target_url not in network_table_sources:
+                    self.learn_network_table(responses, rows)
+                return rows
             
-            # Use the first table (assuming it's the data table)
-            table = tables[0]
-            rows = table.find_all('tr')
-            
-            data_list = []
-            for i, row in enumerate(rows[1:], 1):  # Skip header row
-                cols = row.find_all(['td', 'th'])
-                if len(cols) >= 10:  # Ensure we have enough columns
-                    try:
-                        # Parse count/total from format like "20/199"
-                        count_text = cols[7].get_text(strip=True)
-                        count_match = re.match(r'(\d+)/(\d+)', count_text)
-                        count_current = int(count_match.group(1)) if count_match else 0
-                        count_total = int(count_match.group(2)) if count_match else 0
-                        
-                        data_item = CrawlerData(
-                            account_username=self.account.username,
-                            sequence_number=int(cols[0].get_text(strip=True)),
-                            ip=cols[1].get_text(strip=True),
-                            type=cols[2].get_text(strip=True),
-                            name=cols[3].get_text(strip=True),
-                            level=int(cols[4].get_text(strip=True)) if cols[4].get_text(strip=True).isdigit() else 0,
-                            guild=cols[5].get_text(strip=True),
-                            skill=cols[6].get_text(strip=True),
-                            count_current=count_current,
-                            count_total=count_total,
-                            accumulated_count=0,  # Will be set in accumulate_data
-                            total_time=cols[8].get_text(strip=True),
-                            status=cols[9].get_text(strip=True),
-                            runtime=cols[10].get_text(strip=True) if len(cols) > 10 else "",
-                            keywords_detected={}  # Will be set in accumulate_data
-                        )
-                        data_list.append(data_item)
-                    except (ValueError, AttributeError) as e:
-                        logger.warning(f"Error parsing row {i}: {str(e)}")
-                        continue
-            
-            return data_list
+            # Only the page source is read here, the crawl pipeline parses it lazily
+            if responses and self.config.target_url not in network_table_sources:
+                rows = extract_table_rows(self.driver.page_source, self.config.html_parser) or []
+                self.learn_network_table(responses, rows)
+                return rows
+            return iter_table_rows(self.driver.page_source, self.config.html_parser)
             
         except TimeoutException:
             logger.error("Timeout waiting for table to load")
@@ -493,15 +3192,62 @@ class XiaoBaCrawler:
             logger.error(f"Error parsing table data: {str(e)}")
             return []
     
-    def accumulate_data(self, new_data: List[CrawlerData]):
-        """Accumulate count data with previous records and detect keywords"""
+    def captured_responses(self) -> List[tuple]:
+        """(url, request id) of this tab's XHR and fetch responses in the performance log since it was last read"""
+        if self.context:
+            # Other accounts' tabs share the browser and its performance log
+            return self.context.host.take_responses(self.context.target_id)
+        return [(url, request_id) for _, url, request_id in performance_responses(self.driver)]
+    
+    def response_json(self, request_id: str):
+        """JSON body of a captured response, None when it is gone or not JSON"""
         try:
-            # Define keywords to track
-            keywords_to_track = ["人脸提示", "没钱了", "网络异常", "系统维护", "账号异常", "登录失败"]
-            
-            for new_item in new_data:
+            return parse_response_body(self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id}))
+        except WebDriverException:
+            return None
+    
+    def read_network_table(self, responses: List[tuple]) -> Optional[List[List[str]]]:
+        """Decode the table from its learned JSON response, waiting briefly for the XHR to arrive"""
+        source = network_table_sources.get(self.config.target_url)
+        if not source:
+            return None
+        
+        deadline = time.monotonic() + 10
+        while True:
+            for url, request_id in reversed(responses):
+                if url.split("?")[0] != source["url"]:
+                    continue
+                payload = self.response_json(request_id)
+                rows = decode_table_rows(payload, source) if payload is not None else None
+                if rows:
+                    logger.info(f"Read {len(rows) - 1} rows from the table's JSON response for {self.account.username}")
+                    return rows
+                # The response changed shape, learn it again from the DOM
+                logger.info(f"Table JSON response of {source['url']} no longer matches, falling back to the DOM")
+                network_table_sources.pop(self.config.target_url, None)
+                return None
+            if time.monotonic() >= deadline:
+                logger.info(f"No table JSON response seen for {self.account.username}, falling back to the DOM")
+                return None
+            time.sleep(0.1)
+            responses = self.captured_responses()
+    
+    def learn_network_table(self, responses: List[tuple], dom_rows: List[List[str]]):
+        """Look for the captured JSON response that holds the rows just read from the DOM"""
+        for url, request_id in responses:
+            payload = self.response_json(request_id)
+            source = learn_table_source(url, payload, dom_rows) if payload is not None else None
+            if source:
+                network_table_sources[self.config.target_url] = source
+                logger.info(f"Table data found in JSON response {source['url']}, reading it from the network from now on")
+                return
+    
+    def accumulate_data(self, new_data: Iterable[CrawlerData]) -> Iterator[CrawlerData]:
+        """Accumulate count data with previous records and detect keywords, one row at a time"""
+        for new_item in new_data:
+            try:
                 # Check if we have previous data for this item
-                key = f"{new_item.account_username}_{new_item.sequence_number}_{new_item.ip}"
+                key = row_key(new_item.account_username, new_item.sequence_number, new_item.ip)
                 
                 # Initialize keyword detection
                 new_item.keywords_detected = {}
@@ -513,7 +3259,7 @@ class XiaoBaCrawler:
                     new_item.total_time
                 ]
                 
-                for keyword in keywords_to_track:
+                for keyword in KEYWORDS_TO_TRACK:
                     count = 0
                     for field in text_fields:
                         if field and keyword in str(field):
@@ -522,192 +3268,545 @@ class XiaoBaCrawler:
                         new_item.keywords_detected[keyword] = count
                 
                 # Handle data accumulation logic
-                if key in self.last_data:
-                    last_item = self.last_data[key]
+                last_state = accumulation_state.get(key)
+                if last_state is not None:
+                    last_count, last_accumulated = last_state
                     
                     # Check if count has reset (current < last and significant difference)
-                    if (new_item.count_current < last_item.count_current and 
-                        last_item.count_current - new_item.count_current > 5):
+                    if (new_item.count_current < last_count and 
+                        last_count - new_item.count_current > 5):
                         # Count has reset, accumulate the previous count
-                        new_item.accumulated_count = last_item.accumulated_count + last_item.count_current
-                        logger.info(f"Count reset detected for {key}: {last_item.count_current} -> {new_item.count_current}, accumulated: {new_item.accumulated_count}")
+                        new_item.accumulated_count = last_accumulated + last_count
+                        logger.info(f"Count reset detected for {key}: {last_count} -> {new_item.count_current}, accumulated: {new_item.accumulated_count}")
                     else:
                         # Normal progression, keep previous accumulated count
-                        new_item.accumulated_count = last_item.accumulated_count
+                        new_item.accumulated_count = last_accumulated
                         
                         # If current count is still less than last, add the difference
-                        if new_item.count_current < last_item.count_current:
-                            new_item.accumulated_count += (last_item.count_current - new_item.count_current)
+                        if new_item.count_current < last_count:
+                            new_item.accumulated_count += (last_count - new_item.count_current)
                 else:
                     # First time seeing this item
                     new_item.accumulated_count = 0
                 
-                # Update last data
-                self.last_data[key] = new_item
-                
-        except Exception as e:
-            logger.error(f"Error accumulating data: {str(e)}")
+            except Exception as e:
+                logger.error(f"Error accumulating data: {str(e)}")
+            yield new_item
     
-    async def save_keyword_stats(self, data_list: List[CrawlerData]):
-        """Save keyword statistics to database"""
+    async def save_data(self, data_list: List[CrawlerData]):
+        """Save a batch of crawler data to database with one bulk upsert"""
         try:
-            keyword_stats = {}
+            written = await write_crawler_rows(data_list)
+            failed = set(written["failed"])
+            saved_rows = [data_item for index, data_item in enumerate(data_list) if index not in failed]
+            # The next crawl compares against what was saved
+            accumulation_state.remember(saved_rows)
+            logger.info(
+                f"Saved {len(saved_rows)} of {written['rows']} records for account {self.account.username} "
+                f"({written['upserted']} new, {written['modified']} changed) in {written.get('latency_ms', 0)}ms"
+            )
+            if self.config.history_enabled:
+                try:
+                    await record_history(saved_rows)
+                except Exception as e:
+                    logger.error(f"Error recording history for account {self.account.username}: {str(e)}")
+            # Failed rows keep the table fingerprint stale, the next crawl writes them again
+            return not failed
             
-            for data_item in data_list:
-                for keyword, count in data_item.keywords_detected.items():
-                    if keyword not in keyword_stats:
-                        keyword_stats[keyword] = {
-                            "keyword": keyword,
-                            "total_count": 0,
-                            "accounts_affected": set(),
-                            "last_seen": datetime.utcnow()
-                        }
-                    
-                    keyword_stats[keyword]["total_count"] += count
-                    keyword_stats[keyword]["accounts_affected"].add(data_item.account_username)
-                    keyword_stats[keyword]["last_seen"] = datetime.utcnow()
-            
-            # Update keyword stats in database
-            for keyword, stats in keyword_stats.items():
-                # Convert set to list for JSON serialization
-                stats["accounts_affected"] = list(stats["accounts_affected"])
-                
-                await db.keyword_stats.update_one(
-                    {"keyword": keyword},
-                    {"$set": stats, "$inc": {"total_count": stats["total_count"]}},
-                    upsert=True
-                )
+        except Exception as e:
+            logger.error(f"Error saving data: {str(e)}")
+            return False
+    
+    def diff_rows(self, data_list: List[CrawlerData], fingerprints: Dict[str, str], table_hash) -> List[CrawlerData]:
+        """Fingerprint a batch of crawled rows into the running table hash and return the changed rows"""
+        changed_rows = []
+        for data_item in data_list:
+            key = row_key(data_item.account_username, data_item.sequence_number, data_item.ip)
+            fingerprint = row_fingerprint(data_item)
+            fingerprints[key] = fingerprint
+            table_hash.update(f"{fingerprint}|".encode('utf-8'))
+            if self.row_fingerprints.get(key) != fingerprint:
+                changed_rows.append(data_item)
+        
+        return changed_rows
+    
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run blocking Selenium work for this crawler on the browser worker pool"""
+        if self.context:
+            # A shared browser has to be switched to this account's tab first
+            return await run_in_browser_pool(self.config.max_concurrent, self.context.run, func, *args, **kwargs)
+        return await run_in_browser_pool(self.config.max_concurrent, func, *args, **kwargs)
+    
+    async def fetch_http_data(self) -> Optional[Iterable[List[str]]]:
+        """Try the HTTP fast path, backing off from it for a while after a failure in auto mode"""
+        http_session = self.http_session
+        if self.config.crawl_mode == "auto" and http_session.retry_after and datetime.utcnow() < http_session.retry_after:
+            return None
+        
+        rows = await http_session.fetch_table_data()
+        if rows is None and self.config.crawl_mode == "auto":
+            http_session.retry_after = datetime.utcnow() + timedelta(seconds=self.config.http_retry_interval)
+            logger.info(f"HTTP fast path failed for {self.account.username}, falling back to browser")
+        elif rows is not None:
+            http_session.retry_after = None
+            # The fast path works again, release the fallback browser
+            await self.close_async()
+        return rows
+    
+    async def fetch_browser_data(self) -> Optional[Iterable[List[str]]]:
+        """Crawl the table with Selenium, returns None when login fails"""
+        if self.config.browser_backend == "cdp":
+            if websockets is not None:
+                return await self.fetch_cdp_data()
+            logger.warning("The cdp browser backend needs the websockets package, using Selenium")
+        if self.cdp:
+            # The backend was switched, drop the CDP session
+            await self.close_async()
+        
+        # Browser work runs on the worker pool; DB writes and broadcasts stay on the loop
+        if not self.driver:
+            await self.run_blocking(self.setup_driver)
+            self.logged_in = False
             
-            logger.info(f"Updated keyword stats for {len(keyword_stats)} keywords")
+            # Start from the saved login session instead of logging in again
+            saved = await session_store.load(self.account.username)
+            if saved:
+                await self.run_blocking(self.restore_cookies, saved)
+        
+        await selector_strategies.load(self.config.target_url)
+        logged_in = await self.run_blocking(self.ensure_session)
+        await selector_strategies.flush()
+        if not logged_in:
+            return None
+        
+        if not self.session_saved:
+            cookies = await self.run_blocking(self.driver.get_cookies)
+            await session_store.save(self.account.username, cookies, self.data_url, self.config.session_ttl)
+            self.session_saved = True
             
-        except Exception as e:
-            logger.error(f"Error saving keyword stats: {str(e)}")
+        # Read the table rows
+        return await self.run_blocking(self.parse_table_data)
     
-    async def save_data(self, data_list: List[CrawlerData]):
-        """Save crawler data to database"""
-        try:
-            for data_item in data_list:
-                # Check if record already exists
-                existing = await db.crawler_data.find_one({
-                    "account_username": data_item.account_username,
-                    "sequence_number": data_item.sequence_number,
-                    "ip": data_item.ip
-                })
-                
-                if existing:
-                    # Update existing record
-                    await db.crawler_data.update_one(
-                        {"_id": existing["_id"]},
-                        {"$set": data_item.dict()}
-                    )
-                else:
-                    # Insert new record
-                    await db.crawler_data.insert_one(data_item.dict())
-                    
-            logger.info(f"Saved {len(data_list)} records for account {self.account.username}")
+    async def fetch_cdp_data(self) -> Optional[List[List[str]]]:
+        """Crawl the table on the async CDP backend, returns None when login fails"""
+        if self.driver:
+            # The backend was switched, drop the Selenium driver
+            await self.close_async()
+        
+        if not self.cdp:
+            self.cdp = CdpBrowserSession(self.account, self.config)
+            await self.cdp.setup_driver()
+            self.driver_started_at = datetime.utcnow()
             
-        except Exception as e:
-            logger.error(f"Error saving data: {str(e)}")
+            # Start from the saved login session instead of logging in again
+            saved = await session_store.load(self.account.username)
+            if saved:
+                await self.cdp.restore_cookies(saved)
+        self.cdp.account = self.account
+        self.cdp.config = self.config
+        
+        await selector_strategies.load(self.config.target_url)
+        logged_in = await self.cdp.ensure_session()
+        await selector_strategies.flush()
+        self.driver_pages = self.cdp.pages
+        self.last_login_timings = self.cdp.last_login_timings
+        if not logged_in:
+            return None
+        
+        if not self.cdp.session_saved:
+            cookies = await self.cdp.get_cookies()
+            await session_store.save(self.account.username, cookies, self.cdp.data_url, self.config.session_ttl)
+            self.cdp.session_saved = True
+        
+        return await self.cdp.parse_table_data()
     
     async def crawl_once(self):
         """Perform one crawl cycle"""
         try:
-            if not self.driver:
-                self.setup_driver()
-                
-            if not self.login():
+            rows = None
+            if self.config.crawl_mode in ("auto", "http"):
+                rows = await self.fetch_http_data()
+            if rows is None and self.config.crawl_mode != "http":
+                rows = await self.fetch_browser_data()
+            if rows is None:
                 return False
-                
-            # Parse table data
-            data_list = self.parse_table_data()
             
-            if data_list:
-                # Accumulate data and detect keywords
-                self.accumulate_data(data_list)
-                
-                # Save to database
-                await self.save_data(data_list)
-                
-                # Save keyword statistics
-                await self.save_keyword_stats(data_list)
+            # Previous counts of the account's rows, loaded once and kept across crawler instances
+            await accumulation_state.load(self.account.username)
+            
+            # Rows flow lazily through parse, keyword detection and accumulation,
+            # and reach Mongo and the websockets in batches of write_batch_size
+            pipeline = self.accumulate_data(iter_crawler_rows(rows, self.account.username))
+            fingerprints = {}
+            table_hash = hashlib.sha1()
+            keyword_stats = {}
+            progress_signature = 0
+            row_count = 0
+            changed_count = 0
+            saved = True
+            
+            async for batch in iter_batches(pipeline, self.config.write_batch_size):
+                row_count += len(batch)
+                progress_signature = adaptive_intervals.fold_signature(progress_signature, batch)
+                count_keywords(keyword_stats, batch)
                 
-                # Update account status
+                # Save and broadcast only the rows that changed since the last crawl
+                changed_rows = self.diff_rows(batch, fingerprints, table_hash)
+                if changed_rows:
+                    changed_count += len(changed_rows)
+                    saved = await self.save_data(changed_rows) and saved
+                    await broadcast_crawler_update(self.account.username, changed_rows, final=False)
+            
+            if not row_count:
+                logger.warning(f"No data found for account {self.account.username}")
+                return False
+            
+            # Feed the change rate into the account's adaptive interval
+            adaptive_intervals.observe(self.account.username, progress_signature, bool(keyword_stats), self.config)
+            
+            # Every crawl counts the keywords it saw, whether or not the table changed.
+            # Keyword statistics are flushed for all accounts once per cycle
+            keyword_aggregator.add(keyword_stats)
+            
+            table_fingerprint = table_hash.hexdigest()
+            if table_fingerprint == self.table_fingerprint:
+                # Unchanged table: only touch the heartbeat, no row writes or broadcast
                 await db.crawler_accounts.update_one(
                     {"username": self.account.username},
                     {"$set": {"status": "active", "last_crawl": datetime.utcnow()}}
                 )
-                
-                # Broadcast to websockets
-                await broadcast_crawler_update(self.account.username, data_list)
-                
+                logger.info(f"Table unchanged for account {self.account.username}, skipped writes")
                 return True
-            else:
-                logger.warning(f"No data found for account {self.account.username}")
-                return False
+            
+            if saved:
+                self.table_fingerprint = table_fingerprint
+                self.row_fingerprints = fingerprints
+            
+            # Update account status
+            await db.crawler_accounts.update_one(
+                {"username": self.account.username},
+                {"$set": {"status": "active", "last_crawl": datetime.utcnow()}}
+            )
+            
+            # Tell websocket clients the crawl is complete
+            await broadcast_crawler_update(self.account.username, [], final=True)
+            logger.info(f"Crawled {row_count} rows for account {self.account.username}, {changed_count} changed")
+            
+            return True
                 
         except Exception as e:
             logger.error(f"Crawl error for account {self.account.username}: {str(e)}")
+            # Drop the session so a crashed or wedged browser is replaced next cycle
+            self.logged_in = False
+            await self.close_async()
             await db.crawler_accounts.update_one(
                 {"username": self.account.username},
                 {"$set": {"status": "error"}}
             )
             return False
+        finally:
+            # The cycle is over, recycle the browser now if it crossed a limit
+            await browser_governor.check(self)
     
     def close(self):
-        """Close the driver"""
-        if self.driver:
-            self.driver.quit()
+        """Close the driver, or only this account's context of a shared browser"""
+        if self.context:
+            browser_contexts.close(self.context)
+            self.context = None
+            self.driver = None
+        elif self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logger.warning(f"Error closing driver for {self.account.username}: {str(e)}")
             self.driver = None
+        self.logged_in = False
+        self.driver_started_at = None
+        self.driver_pages = 0
+        self.driver_rss = None
+    
+    async def close_async(self):
+        """Close the browser, Selenium drivers on the browser worker pool"""
+        if self.cdp:
+            cdp, self.cdp = self.cdp, None
+            await cdp.close()
+            self.logged_in = False
+            self.driver_started_at = None
+            self.driver_pages = 0
+            self.driver_rss = None
+        if self.driver:
+            await self.run_blocking(self.close)
+    
+    async def shutdown(self):
+        """Close the driver and the HTTP session"""
+        await self.close_async()
+        await self.http_session.aclose()
+
+class BrowserGovernor:
+    """Recycles crawler browsers that got too old, loaded too many pages or use too much memory"""
+    
+    @staticmethod
+    def driver_rss(driver) -> Optional[int]:
+        """Resident memory in bytes of chromedriver and every browser process it started"""
+        try:
+            return process_tree_rss(driver.service.process.pid)
+        except AttributeError:
+            return None
+    
+    async def measure(self, crawler: "XiaoBaCrawler") -> Optional[int]:
+        """Refresh the recorded memory of a crawler's browser"""
+        if crawler.context or crawler.cdp:
+            # A shared browser's memory belongs to all its accounts, it is reported per host
+            return None
+        loop = asyncio.get_running_loop()
+        crawler.driver_rss = await loop.run_in_executor(None, self.driver_rss, crawler.driver)
+        return crawler.driver_rss
+    
+    @staticmethod
+    def recycle_reason(crawler: "XiaoBaCrawler", config: CrawlerConfig) -> Optional[str]:
+        """Why a browser should be recycled, None while it is within every limit"""
+        if config.browser_max_age and crawler.driver_started_at:
+            age = (datetime.utcnow() - crawler.driver_started_at).total_seconds()
+            if age > config.browser_max_age:
+                return f"age {round(age)}s > {config.browser_max_age}s"
+        if config.browser_max_pages and crawler.driver_pages >= config.browser_max_pages:
+            return f"{crawler.driver_pages} page loads >= {config.browser_max_pages}"
+        if config.browser_max_rss_mb and crawler.driver_rss:
+            rss_mb = crawler.driver_rss / (1024 * 1024)
+            if rss_mb > config.browser_max_rss_mb:
+                return f"memory {round(rss_mb)}MB > {config.browser_max_rss_mb}MB"
+        return None
+    
+    async def check(self, crawler: "XiaoBaCrawler"):
+        """Recycle a crawler's browser between cycles when it crossed a limit"""
+        if not crawler.browser_open:
+            return
+        await self.measure(crawler)
+        reason = self.recycle_reason(crawler, crawler.config)
+        if not reason and (crawler.context or (crawler.cdp and crawler.cdp.page)):
+            # Move off a shared browser that crossed its host limits, it quits once drained
+            loop = asyncio.get_running_loop()
+            if crawler.context:
+                refresh, host = browser_contexts.refresh, crawler.context.host
+            else:
+                refresh, host = cdp_browsers.refresh, crawler.cdp.page.browser
+            retiring = await loop.run_in_executor(None, refresh, host, crawler.config)
+            if retiring:
+                reason = f"shared browser retiring, {retiring}"
+        if not reason:
+            return
+        
+        # The next cycle starts a fresh browser and restores the saved login cookies
+        logger.info(f"Recycling browser of {crawler.account.username}: {reason}")
+        await crawler.close_async()
+        crawler.recycle_count += 1
+        crawler.last_recycle_reason = reason
+    
+    @staticmethod
+    def usage(crawler: "XiaoBaCrawler") -> Dict[str, Any]:
+        """Browser usage of one crawler session as reported by the API"""
+        age = None
+        if crawler.driver_started_at:
+            age = round((datetime.utcnow() - crawler.driver_started_at).total_seconds())
+        return {
+            "username": crawler.account.username,
+            "browser_running": crawler.browser_open,
+            "backend": "cdp" if crawler.cdp else "selenium",
+            "age_seconds": age,
+            "page_loads": crawler.driver_pages,
+            "rss_mb": round(crawler.driver_rss / (1024 * 1024), 1) if crawler.driver_rss else None,
+            "recycle_count": crawler.recycle_count,
+            "last_recycle_reason": crawler.last_recycle_reason
+        }
+
+browser_governor = BrowserGovernor()
+
+class CrawlerSessionManager:
+    """Long-lived crawler sessions keyed by account username"""
+    
+    def __init__(self):
+        self.sessions: Dict[str, XiaoBaCrawler] = {}
+    
+    def get(self, account: CrawlerAccount, config: CrawlerConfig) -> XiaoBaCrawler:
+        """Get the live session for an account, creating it on first use"""
+        crawler = self.sessions.get(account.username)
+        if crawler is None:
+            crawler = XiaoBaCrawler(account, config)
+            self.sessions[account.username] = crawler
+            return crawler
+        
+        crawler.update_account(account, config)
+        return crawler
+    
+    async def close(self, username: str):
+        """Close and forget the session of one account"""
+        crawler = self.sessions.pop(username, None)
+        if crawler:
+            await crawler.shutdown()
+            logger.info(f"Closed browser session for account: {username}")
+    
+    async def prune(self, usernames):
+        """Close sessions of accounts that are no longer crawled"""
+        for username in [name for name in self.sessions if name not in usernames]:
+            await self.close(username)
+    
+    async def close_all(self):
+        """Close every session"""
+        crawlers = list(self.sessions.values())
+        self.sessions.clear()
+        await asyncio.gather(
+            *(crawler.shutdown() for crawler in crawlers),
+            return_exceptions=True
+        )
+
+session_manager = CrawlerSessionManager()
 
 # Helper Functions
-async def broadcast_crawler_update(username: str, data_list: List[CrawlerData]):
-    """Broadcast crawler updates to all connected WebSockets"""
+async def broadcast_crawler_update(username: str, data_list: List[CrawlerData], final: bool = True):
+    """Broadcast crawler updates to all connected WebSockets, final marks the last batch of a crawl"""
     if websocket_connections:
         message = {
             "type": "crawler_update",
             "account": username,
             "data": [item.dict() for item in data_list],
+            "final": final,
             "timestamp": datetime.utcnow().isoformat()
         }
         
         disconnected = set()
-        for websocket in websocket_connections:
+        # Iterate over a snapshot, other crawls may broadcast or connect concurrently
+        for websocket in list(websocket_connections):
             try:
-                await websocket.send_text(json.dumps(message))
+                await websocket.send_text(json.dumps(message, default=str))
             except Exception:
                 disconnected.add(websocket)
         
         # Remove disconnected websockets
-        websocket_connections -= disconnected
+        websocket_connections.difference_update(disconnected)
 
-async def crawl_all_accounts():
-    """Crawl all active accounts"""
+async def crawl_account(username: str):
+    """Scheduled crawl of a single account"""
     try:
-        accounts = await db.crawler_accounts.find({"status": {"$ne": "disabled"}}).to_list(100)
+        # Overlap protection: never run two crawls of the same account at once
+        running = crawls_in_flight.get(username)
+        if running and not running.done():
+            logger.warning(f"Previous crawl of {username} is still running, skipping this tick")
+            return
+        
+        account_data = await db.crawler_accounts.find_one({"username": username})
+        if not account_data or account_data.get("status") == "disabled":
+            return
+        
         config = await get_crawler_config()
+        # Reuse the account's logged-in browser session across cycles
+        crawler = session_manager.get(CrawlerAccount(**account_data), config)
         
-        tasks = []
-        for account_data in accounts:
-            account = CrawlerAccount(**account_data)
-            crawler = XiaoBaCrawler(account, config)
-            active_crawlers[account.username] = crawler
-            
-            # Create crawl task
-            task = asyncio.create_task(crawler.crawl_once())
-            tasks.append(task)
+        task = asyncio.create_task(crawler.crawl_once())
+        crawls_in_flight[username] = task
+        
+        def crawl_done(done: asyncio.Task):
+            if crawls_in_flight.get(username) is done:
+                crawls_in_flight.pop(username, None)
+            apply_adaptive_interval(username, config)
+        
+        task.add_done_callback(crawl_done)
+        
+        # Cycle deadline: a slow crawl keeps running in the background but stops holding the tick
+        deadline = config.crawl_deadline or config.crawl_interval
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=deadline)
+        except asyncio.TimeoutError:
+            logger.warning(f"Crawl of {username} exceeded its {deadline}s deadline, later ticks are skipped until it finishes")
+        
+    except Exception as e:
+        logger.error(f"Error crawling account {username}: {str(e)}")
+
+def schedule_account_job(username: str, config: CrawlerConfig, offset: float):
+    """Register the interval job of one account, starting offset seconds from now"""
+    scheduler.add_job(
+        crawl_account,
+        IntervalTrigger(
+            seconds=adaptive_intervals.interval_for(username, config),
+            jitter=config.crawl_jitter or None,
+            start_date=datetime.now() + timedelta(seconds=offset)
+        ),
+        args=[username],
+        id=f"{CRAWL_JOB_PREFIX}{username}",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=max(1, config.crawl_interval // 2)
+    )
+
+def apply_adaptive_interval(username: str, config: CrawlerConfig):
+    """Reschedule an account's job when its adaptive interval moved"""
+    job = scheduler.get_job(f"{CRAWL_JOB_PREFIX}{username}")
+    if not job or not config.adaptive_interval:
+        return
+    
+    interval = round(adaptive_intervals.interval_for(username, config))
+    if abs(job.trigger.interval.total_seconds() - interval) >= 1:
+        job.reschedule(IntervalTrigger(seconds=interval, jitter=config.crawl_jitter or None))
+        logger.info(f"Adaptive interval for {username} is now {interval} seconds")
+
+async def sync_account_jobs(config: Optional[CrawlerConfig] = None, reschedule: bool = False):
+    """Keep one staggered crawl job per enabled account"""
+    try:
+        config = config or await get_crawler_config()
+        accounts = await db.crawler_accounts.find({"status": {"$ne": "disabled"}}).to_list(100)
+        usernames = [account_data["username"] for account_data in accounts]
         
-        # Wait for all tasks to complete
-        await asyncio.gather(*tasks, return_exceptions=True)
+        # Make sure the worker pool matches the configured concurrency
+        get_browser_pool(config.max_concurrent)
         
-        # Close all crawlers
-        for crawler in active_crawlers.values():
-            crawler.close()
-        active_crawlers.clear()
+        # Drop jobs and sessions of accounts that were deleted or disabled
+        for job in scheduler.get_jobs():
+            if job.id.startswith(CRAWL_JOB_PREFIX) and job.id[len(CRAWL_JOB_PREFIX):] not in usernames:
+                scheduler.remove_job(job.id)
+                adaptive_intervals.forget(job.id[len(CRAWL_JOB_PREFIX):])
+        await session_manager.prune(set(usernames))
+        
+        for index, username in enumerate(usernames):
+            if reschedule or not scheduler.get_job(f"{CRAWL_JOB_PREFIX}{username}"):
+                # Spread accounts evenly over the interval; late additions get a random slot
+                if reschedule:
+                    offset = config.crawl_interval * index / len(usernames)
+                else:
+                    offset = random.uniform(0, config.crawl_interval)
+                schedule_account_job(username, config, offset)
         
-        logger.info(f"Completed crawl cycle for {len(accounts)} accounts")
+        return len(usernames)
         
     except Exception as e:
-        logger.error(f"Error in crawl_all_accounts: {str(e)}")
+        logger.error(f"Error syncing account jobs: {str(e)}")
+        return 0
+
+async def start_scheduler(config: CrawlerConfig):
+    """Schedule per-account crawl jobs and start the scheduler"""
+    # A new schedule starts every account over at the configured interval
+    adaptive_intervals.reset()
+    scheduled = await sync_account_jobs(config, reschedule=True)
+    # Pick up account changes made outside the API
+    scheduler.add_job(
+        sync_account_jobs,
+        IntervalTrigger(seconds=config.crawl_interval),
+        id='crawler_sync',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        keyword_aggregator.flush,
+        IntervalTrigger(seconds=config.crawl_interval),
+        id='keyword_flush',
+        replace_existing=True
+    )
+    if not scheduler.running:
+        scheduler.start()
+    return scheduled
+
+async def refresh_account_jobs():
+    """Resync account jobs after accounts were added, removed, enabled or disabled"""
+    if scheduler.running:
+        await sync_account_jobs()
 
 async def get_crawler_config():
     """Get crawler configuration"""
@@ -742,6 +3841,7 @@ async def get_status_checks():
 async def create_crawler_account(account: CrawlerAccountCreate):
     account_obj = CrawlerAccount(**account.dict())
     await db.crawler_accounts.insert_one(account_obj.dict())
+    await refresh_account_jobs()
     return account_obj
 
 @api_router.get("/crawler/accounts", response_model=List[CrawlerAccount])
@@ -754,6 +3854,9 @@ async def delete_crawler_account(username: str):
     result = await db.crawler_accounts.delete_one({"username": username})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Account not found")
+    await session_manager.close(username)
+    await session_store.delete(username)
+    await refresh_account_jobs()
     return {"message": "Account deleted successfully"}
 
 # Batch Account Management
@@ -765,6 +3868,7 @@ async def enable_all_accounts():
             {},
             {"$set": {"status": "inactive"}}
         )
+        await refresh_account_jobs()
         return {"message": f"Enabled {result.modified_count} accounts for crawling"}
     except Exception as e:
         logger.error(f"Error enabling all accounts: {str(e)}")
@@ -778,6 +3882,8 @@ async def disable_all_accounts():
             {},
             {"$set": {"status": "disabled"}}
         )
+        await session_manager.close_all()
+        await refresh_account_jobs()
         return {"message": f"Disabled {result.modified_count} accounts from crawling"}
     except Exception as e:
         logger.error(f"Error disabling all accounts: {str(e)}")
@@ -793,6 +3899,7 @@ async def enable_account(username: str):
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Account not found")
+        await refresh_account_jobs()
         return {"message": f"Account {username} enabled for crawling"}
     except HTTPException:
         raise
@@ -810,6 +3917,8 @@ async def disable_account(username: str):
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Account not found")
+        await session_manager.close(username)
+        await refresh_account_jobs()
         return {"message": f"Account {username} disabled from crawling"}
     except HTTPException:
         raise
@@ -833,20 +3942,28 @@ async def validate_account(account: CrawlerAccountCreate):
         crawler = XiaoBaCrawler(temp_account, config)
         
         try:
-            crawler.setup_driver()
-            login_result = crawler.login()
-            crawler.close()
+            await selector_strategies.load(config.target_url)
+            if config.browser_backend == "cdp" and websockets is not None:
+                crawler.cdp = CdpBrowserSession(temp_account, config)
+                await crawler.cdp.setup_driver()
+                login_result = await crawler.cdp.login()
+            else:
+                await crawler.run_blocking(crawler.setup_driver)
+                login_result = await crawler.run_blocking(crawler.login)
+            await crawler.close_async()
+            await selector_strategies.flush()
             
             if login_result:
                 # Create account if validation successful
                 account_obj = CrawlerAccount(**account.dict())
                 await db.crawler_accounts.insert_one(account_obj.dict())
+                await refresh_account_jobs()
                 return {"message": "Account validated and created successfully", "account": account_obj}
             else:
                 return {"message": "Account validation failed - login unsuccessful", "valid": False}
                 
         except Exception as e:
-            crawler.close()
+            await crawler.close_async()
             logger.error(f"Error validating account {account.username}: {str(e)}")
             return {"message": f"Account validation failed: {str(e)}", "valid": False}
             
@@ -900,11 +4017,80 @@ async def get_crawler_data(
     data = await db.crawler_data.find(query).sort("crawl_timestamp", -1).to_list(limit)
     return [CrawlerData(**item) for item in data]
 
+@api_router.post("/crawler/data/deduplicate")
+async def deduplicate_crawler_data():
+    """One-off migration: drop duplicate rows written before the unique row key index, then build the indexes"""
+    try:
+        removed = await remove_duplicate_crawler_rows()
+        indexes = await ensure_indexes()
+        return {"removed": removed, "indexes": indexes}
+    except Exception as e:
+        logger.error(f"Error deduplicating crawler data: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/crawler/history")
+async def get_crawler_history(
+    account_username: str,
+    sequence_number: Optional[int] = None,
+    ip: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: str = "auto",
+    limit: int = 5000
+):
+    """History of an account's rows, read from the raw points or the rollup matching the time range"""
+    now = datetime.utcnow()
+    end = end or now
+    start = start or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if resolution == "auto":
+        resolution = pick_history_resolution(start, end, now)
+    elif resolution != "raw" and resolution not in HISTORY_ROLLUPS:
+        raise HTTPException(status_code=400, detail=f"Unknown resolution {resolution}, use auto, raw, {', '.join(HISTORY_ROLLUPS)}")
+    
+    row_filter = {"account_username": account_username}
+    if sequence_number is not None:
+        row_filter["sequence_number"] = sequence_number
+    if ip:
+        row_filter["ip"] = ip
+    
+    try:
+        points = await query_history(row_filter, start, end, resolution, limit)
+        return {"resolution": resolution, "start": start, "end": end, "count": len(points), "points": points}
+    except Exception as e:
+        logger.error(f"Error querying crawler history: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.get("/crawler/data/keywords", response_model=List[KeywordStats])
-async def get_keyword_stats():
-    """Get keyword statistics"""
+async def get_keyword_stats(hours: Optional[int] = None):
+    """Get keyword statistics, all-time or over the last hours from the hourly counters"""
     try:
-        stats = await db.keyword_stats.find().sort("total_count", -1).to_list(100)
+        if hours is None:
+            stats = await db.keyword_stats.find().sort("total_count", -1).to_list(100)
+            return [KeywordStats(**stat) for stat in stats]
+        
+        since = bucket_start(datetime.utcnow() - timedelta(hours=max(1, hours)), KEYWORD_BUCKET_SECONDS)
+        pipeline = [
+            {"$match": {"bucket": {"$gte": since}}},
+            {"$group": {
+                "_id": "$keyword",
+                "total_count": {"$sum": "$count"},
+                "accounts": {"$push": "$accounts"},
+                "last_seen": {"$max": "$last_seen"}
+            }},
+            {"$project": {
+                "keyword": "$_id",
+                "total_count": 1,
+                "accounts_affected": {"$reduce": {
+                    "input": "$accounts", "initialValue": [], "in": {"$setUnion": ["$$value", "$$this"]}
+                }},
+                "last_seen": 1
+            }},
+            {"$sort": {"total_count": -1}},
+            {"$limit": 100}
+        ]
+        stats = await db[KEYWORD_BUCKET_COLLECTION].aggregate(pipeline).to_list(100)
         return [KeywordStats(**stat) for stat in stats]
     except Exception as e:
         logger.error(f"Error getting keyword stats: {str(e)}")
@@ -1088,9 +4274,10 @@ async def generate_mock_data():
                 )
                 mock_data.append(data_item)
         
-        # Insert mock data
-        for data_item in mock_data:
-            await db.crawler_data.insert_one(data_item.dict())
+        # Upsert mock data, repeated runs refresh the same rows
+        written = await write_crawler_rows(mock_data)
+        failed = set(written["failed"])
+        accumulation_state.remember(data_item for index, data_item in enumerate(mock_data) if index not in failed)
         
         return {"message": f"Generated {len(mock_data)} mock data records"}
         
@@ -1119,16 +4306,10 @@ async def start_crawler(background_tasks: BackgroundTasks):
         # Get crawler config to use the correct interval
         config = await get_crawler_config()
         
-        # Start scheduler
+        # Start scheduler with one staggered job per account
         if not scheduler.running:
-            scheduler.add_job(
-                crawl_all_accounts,
-                IntervalTrigger(seconds=config.crawl_interval),
-                id='crawler_job',
-                replace_existing=True
-            )
-            scheduler.start()
-            logger.info(f"Crawler started with {config.crawl_interval} second intervals")
+            scheduled = await start_scheduler(config)
+            logger.info(f"Crawler started for {scheduled} accounts with {config.crawl_interval} second intervals")
             
         return {"message": f"Crawler started successfully with {config.crawl_interval} second intervals"}
         
@@ -1143,10 +4324,9 @@ async def stop_crawler():
         if scheduler.running:
             scheduler.shutdown()
             
-        # Close all active crawlers
-        for crawler in active_crawlers.values():
-            crawler.close()
-        active_crawlers.clear()
+        # Close all browser sessions
+        await session_manager.close_all()
+        await keyword_aggregator.flush()
         
         return {"message": "Crawler stopped successfully"}
         
@@ -1180,6 +4360,149 @@ async def get_crawler_status():
         logger.error(f"Error getting crawler status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/crawler/schedule")
+async def get_crawler_schedule():
+    """Get the per-account crawl schedule and observed change rates"""
+    try:
+        schedule = []
+        for job in scheduler.get_jobs():
+            if not job.id.startswith(CRAWL_JOB_PREFIX):
+                continue
+            username = job.id[len(CRAWL_JOB_PREFIX):]
+            stats = adaptive_intervals.stats.get(username, {})
+            schedule.append({
+                "username": username,
+                "interval": job.trigger.interval.total_seconds(),
+                "next_run_time": job.next_run_time,
+                "crawls": stats.get("crawls", 0),
+                "changes": stats.get("changes", 0),
+                "last_change": stats.get("last_change"),
+                "running": username in crawls_in_flight
+            })
+        return sorted(schedule, key=lambda item: item["username"])
+    except Exception as e:
+        logger.error(f"Error getting crawler schedule: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/crawler/browsers")
+async def get_browser_usage():
+    """Age, page loads and process-tree memory of every crawler browser"""
+    try:
+        browsers = []
+        for crawler in list(session_manager.sessions.values()):
+            if crawler.browser_open:
+                await browser_governor.measure(crawler)
+            browsers.append(browser_governor.usage(crawler))
+        
+        loop = asyncio.get_running_loop()
+        shared_hosts = await loop.run_in_executor(None, browser_contexts.usage)
+        cdp_hosts = await loop.run_in_executor(None, cdp_browsers.usage)
+        
+        return {
+            "memory_tracking": psutil is not None,
+            "running": sum(1 for browser in browsers if browser["browser_running"]),
+            "total_rss_mb": round(
+                sum(browser["rss_mb"] or 0 for browser in browsers) +
+                sum(host["rss_mb"] or 0 for host in shared_hosts + cdp_hosts), 1
+            ),
+            "browsers": browsers,
+            "shared_hosts": shared_hosts,
+            "cdp_browsers": cdp_hosts
+        }
+    except Exception as e:
+        logger.error(f"Error getting browser usage: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/crawler/writes")
+async def get_write_metrics():
+    """Counts and latency of the crawler_data bulk upserts since startup"""
+    return write_metrics.snapshot()
+
+@api_router.get("/crawler/debug/indexes")
+async def get_index_report():
+    """Registered and existing indexes, and the plan of each endpoint's representative query"""
+    try:
+        collections = sorted({spec["collection"] for spec in INDEX_REGISTRY})
+        existing = {}
+        for name in collections:
+            existing[name] = sorted((await db[name].index_information()).keys())
+        missing = [
+            f"{spec['collection']}.{spec['name']}" for spec in INDEX_REGISTRY
+            if spec["name"] not in existing[spec["collection"]]
+        ]
+        
+        queries = []
+        for shape in QUERY_SHAPES:
+            try:
+                queries.append(await explain_query_shape(shape))
+            except Exception as e:
+                queries.append({"endpoint": shape["endpoint"], "collection": shape["collection"], "error": str(e)})
+        
+        return {
+            "registry": INDEX_REGISTRY,
+            "existing": existing,
+            "missing": missing,
+            "collection_scans": [query["endpoint"] for query in queries if query.get("collection_scan")],
+            "queries": queries
+        }
+    except Exception as e:
+        logger.error(f"Error building index report: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/crawler/debug/indexes")
+async def rebuild_indexes():
+    """Build any registered index that is missing"""
+    try:
+        return await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Error building indexes: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/crawler/debug/probe/{username}")
+async def probe_account_page(username: str, contains: Optional[str] = None, limit: int = 200):
+    """Describe the buttons, inputs, links and divs on an account's live browser page"""
+    crawler = session_manager.sessions.get(username)
+    if not crawler or not crawler.driver:
+        raise HTTPException(status_code=404, detail="No live browser session for this account")
+    
+    try:
+        elements = await crawler.run_blocking(probe_elements, crawler.driver, contains=contains, limit=limit)
+        current_url = await crawler.run_blocking(lambda: crawler.driver.current_url)
+        return {
+            "username": username,
+            "url": current_url,
+            "elements": [{key: value for key, value in element.items() if key != "handle"} for element in elements]
+        }
+    except Exception as e:
+        logger.error(f"Error probing page for {username}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/crawler/debug/screenshots")
+async def list_debug_screenshots(account: Optional[str] = None, limit: int = 100):
+    """List the retained login debug screenshots, newest first"""
+    try:
+        config = await get_crawler_config()
+        screenshots = ScreenshotRecorder.list(config.screenshot_dir)
+        if account:
+            screenshots = [item for item in screenshots if item["account"] == ScreenshotRecorder.file_account(account)]
+        return {
+            "policy": config.screenshot_policy,
+            "total_bytes": sum(item["size"] for item in screenshots),
+            "screenshots": screenshots[:limit]
+        }
+    except Exception as e:
+        logger.error(f"Error listing screenshots: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/crawler/debug/screenshots/{name}")
+async def get_debug_screenshot(name: str):
+    """Download one login debug screenshot"""
+    config = await get_crawler_config()
+    path = os.path.join(config.screenshot_dir, os.path.basename(name))
+    if not name.endswith(".png") or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    return FileResponse(path, media_type="image/png")
+
 @api_router.post("/crawler/test/{username}")
 async def test_crawler_account(username: str):
     """Test a specific crawler account"""
@@ -1193,7 +4516,7 @@ async def test_crawler_account(username: str):
         
         crawler = XiaoBaCrawler(account, config)
         result = await crawler.crawl_once()
-        crawler.close()
+        await crawler.shutdown()
         
         return {
             "username": username,
@@ -1229,17 +4552,20 @@ async def update_crawler_config(config_update: dict):
             {"$set": config_update}
         )
         
-        # If crawl_interval was changed and scheduler is running, restart it
-        if "crawl_interval" in config_update and scheduler.running:
-            scheduler.remove_job('crawler_job')
+        # If the schedule changed and scheduler is running, reschedule every account
+        schedule_fields = {"crawl_interval", "crawl_jitter", "adaptive_interval", "min_crawl_interval", "max_crawl_interval"}
+        if schedule_fields & set(config_update) and scheduler.running:
             new_config = await get_crawler_config()
-            scheduler.add_job(
-                crawl_all_accounts,
-                IntervalTrigger(seconds=new_config.crawl_interval),
-                id='crawler_job',
-                replace_existing=True
-            )
-            logger.info(f"Restarted crawler with new interval: {new_config.crawl_interval} seconds")
+            await start_scheduler(new_config)
+            logger.info(f"Rescheduled crawler with new interval: {new_config.crawl_interval} seconds")
+        
+        # Relaunch pooled browsers whose options no longer match
+        pool_fields = {
+            "headless", "timeout", "block_resources", "resource_allowlist", "warm_pool_size",
+            "browser_backend", "browser_contexts", "network_capture"
+        }
+        if pool_fields & set(config_update):
+            warm_driver_pool.top_up(await get_crawler_config())
             
         return {"message": "Configuration updated successfully"}
         
@@ -1287,6 +4613,13 @@ async def startup_event():
         await db.crawler_config.insert_one(config.dict())
         logger.info("Created default crawler configuration")
     
+    # Indexes of the dashboard queries and the unique row key of the crawl upserts
+    try:
+        await ensure_history_collection()
+    except Exception as e:
+        logger.error(f"Error creating history collection: {str(e)}")
+    await ensure_indexes()
+    
     # Auto-start the crawler for continuous operation
     try:
         # Initialize default accounts if none exist
@@ -1308,16 +4641,13 @@ async def startup_event():
         # Get crawler config to use the correct interval
         config = await get_crawler_config()
         
+        # Pre-launch browsers in the background so the first sessions don't wait for Chrome
+        warm_driver_pool.start(config)
+        
         # Start scheduler automatically
         if not scheduler.running:
-            scheduler.add_job(
-                crawl_all_accounts,
-                IntervalTrigger(seconds=config.crawl_interval),
-                id='crawler_job',
-                replace_existing=True
-            )
-            scheduler.start()
-            logger.info(f"Auto-started crawler with {config.crawl_interval} second intervals")
+            scheduled = await start_scheduler(config)
+            logger.info(f"Auto-started crawler for {scheduled} accounts with {config.crawl_interval} second intervals")
             
     except Exception as e:
         logger.error(f"Error auto-starting crawler: {str(e)}")
@@ -1332,10 +4662,13 @@ async def shutdown_event():
     if scheduler.running:
         scheduler.shutdown()
     
-    # Close all crawlers
-    for crawler in active_crawlers.values():
-        crawler.close()
-    active_crawlers.clear()
+    # Close all browser sessions
+    await session_manager.close_all()
+    await keyword_aggregator.flush()
+    await warm_driver_pool.close_all()
+    await cdp_browsers.close_all()
+    shutdown_browser_pool()
+    screenshot_recorder.stop()
     
     # Close database connection
     client.close()
\ No newline at end of file
@@ -46,7 +46,8 @@ const App = () => {
         wsRef.current.onmessage = (event) => {
           try {
             const data = JSON.parse(event.data);
-            if (data.type === 'crawler_update') {
+            // 大表会分批推送，只在一次爬取的最后一批后刷新
+            if (data.type === 'crawler_update' && data.final !== false) {
               console.log('收到实时更新:', data);
               fetchAllData();
             }
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# server.py lives in backend/ and reads backend/.env, no database is contacted on import
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,93 @@
+import asyncio
+
+import server
+from server import AccumulationStore, CrawlerData, XiaoBaCrawler, row_key
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def to_list(self, length):
+        return list(self.rows)
+
+class FakeCollection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return FakeCursor([row for row in self.rows if row["account_username"] == query["account_username"]])
+
+class FakeDatabase:
+    def __init__(self, rows):
+        self.crawler_data = FakeCollection(rows)
+
+def saved(username, sequence_number, count_current, accumulated_count):
+    return {
+        "account_username": username, "sequence_number": sequence_number, "ip": f"1.2.3.{sequence_number}",
+        "count_current": count_current, "accumulated_count": accumulated_count
+    }
+
+def crawler_row(sequence_number, count_current, username="KR666"):
+    return CrawlerData(
+        account_username=username, sequence_number=sequence_number, ip=f"1.2.3.{sequence_number}", type="鬼砍",
+        name="角色", level=100, guild="青帮", skill="0", count_current=count_current, count_total=100,
+        total_time="2/100", status="在线", runtime="00:01:02"
+    )
+
+def test_load_reads_an_account_once(monkeypatch):
+    db = FakeDatabase([saved("KR666", 1, 10, 3), saved("KR666", 2, 4, 0), saved("other", 1, 9, 9)])
+    monkeypatch.setattr(server, "db", db)
+    store = AccumulationStore()
+    asyncio.run(store.load("KR666"))
+    asyncio.run(store.load("KR666"))
+
+    assert db.crawler_data.queries == [{"account_username": "KR666"}]
+    assert store.get(row_key("KR666", 1, "1.2.3.1")) == (10, 3)
+    assert store.get(row_key("KR666", 2, "1.2.3.2")) == (4, 0)
+    assert store.get(row_key("other", 1, "1.2.3.1")) is None
+
+def test_remember_overwrites_the_saved_state():
+    store = AccumulationStore()
+    store.remember([crawler_row(1, 10)])
+    row = crawler_row(1, 2)
+    row.accumulated_count = 10
+    store.remember([row])
+    assert store.get(row_key("KR666", 1, "1.2.3.1")) == (2, 10)
+
+def test_eviction_drops_least_recently_used_rows_and_unmarks_their_account(monkeypatch):
+    db = FakeDatabase([saved("KR666", 1, 10, 0), saved("KR666", 2, 20, 0)])
+    monkeypatch.setattr(server, "db", db)
+    store = AccumulationStore(max_rows=2)
+    asyncio.run(store.load("KR666"))
+    # Reading row 1 makes row 2 the least recently used
+    store.get(row_key("KR666", 1, "1.2.3.1"))
+    store.remember([crawler_row(1, 5, username="other")])
+
+    assert store.get(row_key("KR666", 2, "1.2.3.2")) is None
+    assert store.get(row_key("KR666", 1, "1.2.3.1")) == (10, 0)
+    assert "KR666" not in store.loaded
+    # The incomplete account is read again on its next crawl
+    asyncio.run(store.load("KR666"))
+    assert len(db.crawler_data.queries) == 2
+
+def test_accumulate_data_carries_the_count_over_a_reset(monkeypatch):
+    store = AccumulationStore()
+    monkeypatch.setattr(server, "accumulation_state", store)
+    first = crawler_row(1, 50)
+    first.accumulated_count = 7
+    store.remember([first, crawler_row(2, 50), crawler_row(3, 50)])
+
+    rows = list(XiaoBaCrawler.accumulate_data(None, [crawler_row(1, 2), crawler_row(2, 48), crawler_row(3, 60)]))
+    # Dropped by more than 5, the previous count is added to the accumulated one
+    assert rows[0].accumulated_count == 57
+    # A small drop only adds the difference
+    assert rows[1].accumulated_count == 2
+    assert rows[2].accumulated_count == 0
+
+    row = crawler_row(4, 9)
+    row.status = "账号异常"
+    [new] = XiaoBaCrawler.accumulate_data(None, [row])
+    assert new.accumulated_count == 0
+    assert new.keywords_detected == {"账号异常": 1}
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import server
+from server import CdpBrowser, CdpBrowserPool, CdpBrowserSession, CdpPage, CrawlerAccount, CrawlerConfig, XiaoBaCrawler
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self):
+        self.listeners = {}
+
+    async def send(self, method, params=None, timeout=None):
+        return {}
+
+def fake_browser(age):
+    browser = CdpBrowser(SimpleNamespace(pid=0, returncode=None), FakeConnection(), "/nonexistent")
+    browser.started_at = datetime.utcnow() - age
+    browser.stopped = False
+
+    async def close():
+        browser.stopped = True
+    browser.close = close
+    return browser
+
+def test_refresh_retires_browsers_past_the_age_limit(monkeypatch):
+    monkeypatch.setattr(server, "process_tree_rss", lambda pid: None)
+    pool = CdpBrowserPool()
+    config = CrawlerConfig(browser_max_age=3600)
+    assert pool.refresh(fake_browser(timedelta(minutes=5)), config) is None
+    old = fake_browser(timedelta(hours=2))
+    assert pool.refresh(old, config).startswith("age")
+    assert old.retiring
+
+def test_refresh_retires_browsers_past_the_memory_limit(monkeypatch):
+    monkeypatch.setattr(server, "process_tree_rss", lambda pid: 3000 * 1024 * 1024)
+    browser = fake_browser(timedelta(minutes=5))
+    assert CdpBrowserPool().refresh(browser, CrawlerConfig(shared_browser_max_rss_mb=2048)).startswith("memory")
+
+def test_governor_moves_accounts_off_a_retiring_browser(monkeypatch):
+    monkeypatch.setattr(server, "process_tree_rss", lambda pid: None)
+    pool = CdpBrowserPool()
+    monkeypatch.setattr(server, "cdp_browsers", pool)
+    browser = fake_browser(timedelta(hours=2))
+    pool.browsers.append(browser)
+    page = CdpPage(browser, "context", "target", "session")
+    browser.pages[page.target_id] = page
+
+    config = CrawlerConfig(browser_backend="cdp", browser_max_age=3600)
+    crawler = XiaoBaCrawler(CrawlerAccount(username="KR666", password="x"), config)
+    # The account's own context is new, only its browser is old
+    crawler.driver_started_at = datetime.utcnow()
+    crawler.cdp = CdpBrowserSession(crawler.account, config)
+    crawler.cdp.page = page
+    asyncio.run(server.browser_governor.check(crawler))
+
+    assert crawler.last_recycle_reason.startswith("shared browser retiring")
+    # The drained browser is stopped
+    assert browser.stopped
+    assert not pool.browsers
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from server import CrawlerData, bucket_start, history_point, pick_history_resolution, rollup_update
+
+NOW = datetime(2024, 5, 10, 12, 0, 0)
+
+def crawler_row(**values):
+    row = dict(
+        account_username="KR666", sequence_number=1, ip="1.2.3.4", type="鬼砍", name="角色1", level=100,
+        guild="青帮", skill="0", count_current=5, count_total=100, accumulated_count=7, total_time="2/100",
+        status="在线", runtime="00:01:02", crawl_timestamp=datetime(2024, 5, 10, 11, 42, 17, 500000)
+    )
+    row.update(values)
+    return CrawlerData(**row)
+
+def test_bucket_start_floors_to_the_bucket():
+    timestamp = datetime(2024, 5, 10, 11, 42, 17, 500000)
+    assert bucket_start(timestamp, 60) == datetime(2024, 5, 10, 11, 42)
+    assert bucket_start(timestamp, 3600) == datetime(2024, 5, 10, 11, 0)
+    assert bucket_start(timestamp, 86400) == datetime(2024, 5, 10)
+
+def test_bucket_start_keeps_a_timestamp_on_a_boundary():
+    assert bucket_start(datetime(2024, 5, 10, 11, 0), 3600) == datetime(2024, 5, 10, 11, 0)
+    assert bucket_start(datetime(1970, 1, 1), 60) == datetime(1970, 1, 1)
+
+def test_short_recent_ranges_use_raw_points():
+    assert pick_history_resolution(NOW - timedelta(hours=1), NOW, NOW) == "raw"
+    assert pick_history_resolution(NOW - timedelta(hours=6), NOW, NOW) == "raw"
+
+def test_longer_ranges_use_coarser_rollups():
+    assert pick_history_resolution(NOW - timedelta(hours=7), NOW, NOW) == "1m"
+    assert pick_history_resolution(NOW - timedelta(days=3), NOW, NOW) == "1m"
+    assert pick_history_resolution(NOW - timedelta(days=4), NOW, NOW) == "1h"
+    assert pick_history_resolution(NOW - timedelta(days=91), NOW, NOW) == "1d"
+
+def test_ranges_starting_past_a_retention_skip_that_resolution():
+    # One hour, but older than the raw retention
+    start = NOW - timedelta(days=8)
+    assert pick_history_resolution(start, start + timedelta(hours=1), NOW) == "1m"
+    # Older than the 1m retention
+    start = NOW - timedelta(days=31)
+    assert pick_history_resolution(start, start + timedelta(hours=1), NOW) == "1h"
+    # Only the daily rollup is kept forever
+    start = NOW - timedelta(days=400)
+    assert pick_history_resolution(start, start + timedelta(hours=1), NOW) == "1d"
+
+def test_history_point_keys_the_row():
+    point = history_point(crawler_row())
+    assert point["row"] == {"account_username": "KR666", "sequence_number": 1, "ip": "1.2.3.4"}
+    assert point["count_current"] == 5
+    assert point["accumulated_count"] == 7
+
+def test_rollup_update_targets_the_row_bucket():
+    update = rollup_update(crawler_row(), 3600)
+    document = update._doc
+    assert update._filter == {
+        "account_username": "KR666", "sequence_number": 1, "ip": "1.2.3.4", "bucket": datetime(2024, 5, 10, 11, 0)
+    }
+    assert update._upsert
+    assert document["$min"] == {"count_current_min": 5}
+    assert document["$max"] == {"count_current_max": 5, "accumulated_count": 7}
+    assert document["$inc"] == {"samples": 1}
@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from pymongo.errors import BulkWriteError
+
+import server
+from server import (KEYWORD_BUCKET_COLLECTION, AccumulationStore, CrawlerAccount, CrawlerConfig, KeywordAggregator,
+                    XiaoBaCrawler)
+
+class FakeCollection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.writes = []
+
+    async def bulk_write(self, operations, ordered=True):
+        if isinstance(self.fail, Exception):
+            raise self.fail
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.writes.append(operations)
+        return SimpleNamespace(upserted_count=len(operations), modified_count=0)
+
+    def find(self, query, projection=None):
+        return SimpleNamespace(to_list=self.no_rows)
+
+    async def no_rows(self, length):
+        return []
+
+    async def update_one(self, query, update):
+        pass
+
+class FakeDatabase(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+def fake_db(fail=False):
+    return FakeDatabase({
+        "keyword_stats": FakeCollection(fail), KEYWORD_BUCKET_COLLECTION: FakeCollection(fail),
+        "crawler_data": FakeCollection(), "crawler_accounts": FakeCollection()
+    })
+
+def stats(count, accounts, last_seen):
+    return {"total_count": count, "accounts_affected": set(accounts), "last_seen": last_seen}
+
+def test_add_merges_crawls_per_keyword_and_hour():
+    aggregator = KeywordAggregator()
+    aggregator.add({"在线": stats(2, ["a"], datetime(2024, 5, 10, 11, 5))})
+    aggregator.add({"在线": stats(3, ["b"], datetime(2024, 5, 10, 11, 40))})
+    aggregator.add({"在线": stats(1, ["a"], datetime(2024, 5, 10, 12, 1))})
+    assert aggregator.totals["在线"] == {
+        "count": 6, "accounts": {"a", "b"}, "last_seen": datetime(2024, 5, 10, 12, 1)
+    }
+    assert aggregator.buckets[("在线", datetime(2024, 5, 10, 11))]["count"] == 5
+    assert aggregator.buckets[("在线", datetime(2024, 5, 10, 12))]["count"] == 1
+
+def test_flush_writes_one_bulk_per_collection(monkeypatch):
+    db = fake_db()
+    monkeypatch.setattr(server, "db", db)
+    aggregator = KeywordAggregator()
+    aggregator.add({
+        "在线": stats(2, ["b", "a"], datetime(2024, 5, 10, 11, 5)),
+        "离线": stats(1, ["a"], datetime(2024, 5, 10, 11, 5)),
+    })
+    asyncio.run(aggregator.flush())
+
+    assert not aggregator.totals and not aggregator.buckets
+    [totals] = db["keyword_stats"].writes
+    [buckets] = db[KEYWORD_BUCKET_COLLECTION].writes
+    assert len(totals) == 2 and len(buckets) == 2
+    update = {operation._filter["keyword"]: operation for operation in totals}["在线"]
+    assert update._upsert
+    assert update._doc == {
+        "$inc": {"total_count": 2},
+        "$addToSet": {"accounts_affected": {"$each": ["a", "b"]}},
+        "$max": {"last_seen": datetime(2024, 5, 10, 11, 5)}
+    }
+    assert buckets[0]._filter["bucket"] == datetime(2024, 5, 10, 11)
+
+def test_flush_without_counts_writes_nothing(monkeypatch):
+    db = fake_db()
+    monkeypatch.setattr(server, "db", db)
+    asyncio.run(KeywordAggregator().flush())
+    assert not db["keyword_stats"].writes
+
+def test_failed_flush_keeps_counts_for_the_next_one(monkeypatch):
+    monkeypatch.setattr(server, "db", fake_db(fail=True))
+    aggregator = KeywordAggregator()
+    aggregator.add({"在线": stats(2, ["a"], datetime(2024, 5, 10, 11, 5))})
+    asyncio.run(aggregator.flush())
+    # Counts added while the write was failing merge with the re-queued ones
+    aggregator.add({"在线": stats(3, ["b"], datetime(2024, 5, 10, 11, 6))})
+    assert aggregator.totals["在线"]["count"] == 5
+    assert aggregator.totals["在线"]["accounts"] == {"a", "b"}
+
+    db = fake_db()
+    monkeypatch.setattr(server, "db", db)
+    asyncio.run(aggregator.flush())
+    [totals] = db["keyword_stats"].writes
+    assert totals[0]._doc["$inc"] == {"total_count": 5}
+
+def test_only_the_failed_collection_is_written_again(monkeypatch):
+    db = fake_db()
+    db[KEYWORD_BUCKET_COLLECTION].fail = True
+    monkeypatch.setattr(server, "db", db)
+    aggregator = KeywordAggregator()
+    aggregator.add({"在线": stats(2, ["a"], datetime(2024, 5, 10, 11, 5))})
+    asyncio.run(aggregator.flush())
+    assert len(db["keyword_stats"].writes) == 1
+    assert not aggregator.totals
+    assert aggregator.buckets[("在线", datetime(2024, 5, 10, 11))]["count"] == 2
+
+    db[KEYWORD_BUCKET_COLLECTION].fail = False
+    asyncio.run(aggregator.flush())
+    # The totals were applied once, only the buckets are written again
+    assert len(db["keyword_stats"].writes) == 1
+    [buckets] = db[KEYWORD_BUCKET_COLLECTION].writes
+    assert buckets[0]._doc["$inc"] == {"count": 2}
+    assert not aggregator.buckets
+
+def test_partially_applied_bulk_write_keeps_only_the_failed_operations(monkeypatch):
+    db = fake_db()
+    aggregator = KeywordAggregator()
+    aggregator.add({
+        "在线": stats(2, ["a"], datetime(2024, 5, 10, 11, 5)),
+        "离线": stats(1, ["a"], datetime(2024, 5, 10, 11, 5)),
+    })
+    failed_index = list(aggregator.totals).index("离线")
+    db["keyword_stats"].fail = BulkWriteError({
+        "nUpserted": 1, "nModified": 0, "writeErrors": [{"index": failed_index, "code": 2, "errmsg": "bad"}]
+    })
+    monkeypatch.setattr(server, "db", db)
+    asyncio.run(aggregator.flush())
+    assert list(aggregator.totals) == ["离线"]
+    assert not aggregator.buckets
+
+def test_every_crawl_counts_its_keywords_whether_or_not_the_table_changed(monkeypatch):
+    monkeypatch.setattr(server, "db", fake_db())
+    monkeypatch.setattr(server, "keyword_aggregator", KeywordAggregator())
+    monkeypatch.setattr(server, "accumulation_state", AccumulationStore())
+
+    async def no_broadcast(*args, **kwargs):
+        pass
+    monkeypatch.setattr(server, "broadcast_crawler_update", no_broadcast)
+
+    crawler = XiaoBaCrawler(CrawlerAccount(username="KR666", password="x"),
+                            CrawlerConfig(crawl_mode="http", history_enabled=False))
+    header = ["序号", "IP", "类型", "命名", "等级", "门派", "绝技", "次数", "总时间", "状态", "运行时间"]
+    stuck = ["1", "1.2.3.4", "鬼砍", "角色1", "100", "青帮", "0", "1/100", "2/100", "账号异常", "00:01:02"]
+    for runtime in ["00:00:01", "00:00:01", "00:00:01", "00:00:05"]:
+        other = ["2", "1.2.3.5", "剑客", "角色2", "99", "五毒", "1", "3/100", "2/100", "在线", runtime]
+
+        async def fetch(rows=[header, stuck, other]):
+            return rows
+        crawler.fetch_http_data = fetch
+        assert asyncio.run(crawler.crawl_once())
+
+    assert server.keyword_aggregator.totals["账号异常"]["count"] == 4
@@ -0,0 +1,93 @@
+import base64
+import json
+
+from server import (BrowserContext, CrawlerAccount, CrawlerConfig, SharedBrowserHost, XiaoBaCrawler,
+                    decode_table_rows, learn_table_source, parse_response_body)
+
+HEADER = ["序号", "IP", "类型", "命名", "等级", "门派", "绝技", "次数", "总时间", "状态", "运行时间"]
+DOM_ROWS = [
+    HEADER,
+    ["1", "1.2.3.4", "鬼砍", "角色1", "100", "青帮", "0", "1/100", "2/100", "在线", "00:01:02"],
+    ["2", "1.2.3.5", "剑客", "角色2", "99", "五毒", "1", "3/100", "2/100", "离线", "00:01:03"],
+]
+KEYS = ["id", "ip", "type", "name", "level", "guild", "skill", "count", "time", "status", "runtime"]
+
+def record(row):
+    values = dict(zip(KEYS, row))
+    values["id"] = int(values["id"])
+    values["level"] = int(values["level"])
+    values["extra"] = "ignored"
+    return values
+
+def test_learns_dict_records_and_decodes_them_back():
+    payload = {"code": 0, "data": {"list": [record(row) for row in DOM_ROWS[1:]]}}
+    source = learn_table_source("http://host/api/list?page=1", payload, DOM_ROWS)
+    assert source == {"url": "http://host/api/list", "path": ["data", "list"], "columns": KEYS}
+    assert decode_table_rows(payload, source)[1:] == DOM_ROWS[1:]
+
+def test_learns_list_records():
+    payload = {"rows": [list(row) for row in DOM_ROWS[1:]]}
+    source = learn_table_source("http://host/rows", payload, DOM_ROWS)
+    assert source["columns"] == list(range(11))
+    assert decode_table_rows(payload, source)[1:] == DOM_ROWS[1:]
+
+def test_rejects_response_that_does_not_reproduce_every_row():
+    records = [record(row) for row in DOM_ROWS[1:]]
+    records[1]["status"] = "忙碌"
+    assert learn_table_source("http://host/api", {"list": records}, DOM_ROWS) is None
+
+def test_rejects_unrelated_json():
+    assert learn_table_source("http://host/api", {"ok": True, "items": [{"a": 1}]}, DOM_ROWS) is None
+    assert learn_table_source("http://host/api", {"list": []}, DOM_ROWS) is None
+
+def test_decode_returns_none_when_the_shape_changed():
+    source = {"url": "http://host/api", "path": ["data", "list"], "columns": KEYS}
+    assert decode_table_rows({"data": {}}, source) is None
+    assert decode_table_rows({"data": {"list": "oops"}}, source) is None
+
+def test_parse_response_body():
+    encoded = base64.b64encode(json.dumps({"a": [1]}).encode()).decode()
+    assert parse_response_body({"body": encoded, "base64Encoded": True}) == {"a": [1]}
+    assert parse_response_body({"body": "<html></html>"}) is None
+
+def log_entry(webview, url, request_id):
+    params = {"type": "XHR", "requestId": request_id, "response": {"url": url, "status": 200}}
+    message = {"message": {"method": "Network.responseReceived", "params": params}, "webview": webview}
+    return {"level": "INFO", "message": json.dumps(message)}
+
+class FakeDriver:
+    current_window_handle = "default"
+
+    def __init__(self):
+        self.log = []
+
+    def execute(self, command, params=None):
+        if command == "getLog":
+            entries, self.log = self.log, []
+            return {"value": entries}
+        return {"value": None}
+
+    def get_log(self, log_type):
+        return self.execute("getLog", {"type": log_type})["value"]
+
+def test_shared_browser_keeps_each_tabs_responses_for_its_own_account():
+    driver = FakeDriver()
+    host = SharedBrowserHost(driver)
+    crawlers = {}
+    for target_id in ("tab-a", "tab-b"):
+        crawler = XiaoBaCrawler(CrawlerAccount(username=target_id, password="x"), CrawlerConfig(network_capture=True))
+        crawler.driver = driver
+        crawler.context = BrowserContext(host, f"context-{target_id}", target_id, target_id)
+        host.responses[target_id] = []
+        crawlers[target_id] = crawler
+
+    driver.log = [
+        log_entry("tab-a", "http://host/api?page=1", "a1"),
+        log_entry("tab-b", "http://host/api?page=1", "b1"),
+        log_entry("closed-tab", "http://host/api", "c1"),
+    ]
+    # Reading a's responses drains b's entries from the log, b still gets them
+    assert crawlers["tab-a"].captured_responses() == [("http://host/api?page=1", "a1")]
+    driver.log = [log_entry("tab-b", "http://host/api?page=2", "b2")]
+    assert crawlers["tab-b"].captured_responses() == [("http://host/api?page=1", "b1"), ("http://host/api?page=2", "b2")]
+    assert crawlers["tab-a"].captured_responses() == []
@@ -0,0 +1,53 @@
+import pytest
+
+from server import (
+    TABLE_PARSER_BACKENDS,
+    FirstTableParser,
+    available_table_parsers,
+    extract_table_rows,
+    has_unclosed_table_tags,
+    resolve_table_parser,
+)
+from parser_benchmark import build_page
+
+WELL_FORMED = {
+    "page": build_page(50),
+    "uppercase": "<TABLE><TR><TH>a</TH></TR><TR><TD> b </TD></TR></TABLE>",
+    "thead": "<table><thead><tr><th>h</th></tr></thead><tbody><tr><td>x</td></tr></tbody></table>",
+    "nested_table": "<table><tr><td>a<table><tr><td>x</td></tr></table></td></tr></table>",
+    "script_and_comment": "<table><tr><td>a<script>x</script> b<!--c--></td></tr></table>",
+    "entities": "<table><tr><td>&amp; &lt;x&gt;&nbsp;</td><td></td></tr></table>",
+    "no_table": "<p>nothing here</p>",
+    "empty": "",
+}
+
+MALFORMED = {
+    "unclosed_cells": "<table><tr><th>h<th>i</tr><tr><td>a<td>b<td>c</tr></table>",
+    "unclosed_row": "<table><tr><td>a</td><tr><td>b</td></tr></table>",
+    "unclosed_table": "<table><tr><td>a</td></tr>",
+    "stray_end_tag": "<table><tr><td>a</td></td></tr></table>",
+}
+
+@pytest.mark.parametrize("backend", available_table_parsers())
+@pytest.mark.parametrize("name", list(WELL_FORMED) + list(MALFORMED))
+def test_backend_matches_bs4(backend, name):
+    html = {**WELL_FORMED, **MALFORMED}[name]
+    assert TABLE_PARSER_BACKENDS[backend](html) == TABLE_PARSER_BACKENDS["bs4"](html)
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 4096])
+@pytest.mark.parametrize("name", list(WELL_FORMED) + list(MALFORMED))
+def test_chunked_stream_matches_whole_page(chunk_size, name):
+    html = {**WELL_FORMED, **MALFORMED}[name]
+    rows = list(FirstTableParser().iter_rows(html, chunk_size))
+    assert rows == (extract_table_rows(html, "bs4") or [])
+
+def test_unclosed_table_tags_detection():
+    for html in WELL_FORMED.values():
+        assert not has_unclosed_table_tags(html)
+    for html in MALFORMED.values():
+        assert has_unclosed_table_tags(html)
+
+def test_auto_resolves_to_fastest_installed_backend():
+    assert resolve_table_parser("auto") == next(
+        name for name in ("selectolax", "lxml", "stream") if name in available_table_parsers()
+    )